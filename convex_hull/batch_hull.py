@@ -0,0 +1,212 @@
+#!/usr/bin/python3
+
+# Hulls of many small point sets at once.  The sets arrive as one flat
+# (N, 2) array plus offsets, set k being points[offsets[k]:offsets[k + 1]],
+# and every step of the monotone chain runs as a numpy pass over all sets
+# together instead of one solver call per set.
+
+import numpy as np
+
+from hull_core import CCW_ERRBOUND, chainScan, orientSigns, toPointArray
+
+
+# pruning passes before any sets still not convex are finished one by one
+MAX_PASSES = 64
+
+
+def setBoundaries(setIds):
+    # True where a run of equal set ids starts / ends
+    n = len(setIds)
+    starts = np.ones(n, dtype=bool)
+    ends = np.ones(n, dtype=bool)
+    if n > 1:
+        starts[1:] = setIds[1:] != setIds[:-1]
+        ends[:-1] = starts[1:]
+    return starts, ends
+
+
+def batchChains(xs, ys, setOf, idx, sign):
+    # Prune every set's chain at once: a point that fails to turn the right
+    # way against neighbours from its own set lies under a chord and goes.
+    # Set end points are never touched.
+    for _ in range(MAX_PASSES):
+        if len(idx) < 3:
+            return idx
+        sid = setOf[idx]
+        interior = (sid[1:-1] == sid[:-2]) & (sid[1:-1] == sid[2:])
+        turn = orientSigns(xs[idx[:-2]], ys[idx[:-2]], xs[idx[1:-1]], ys[idx[1:-1]], xs[idx[2:]], ys[idx[2:]])
+        keep = np.ones(len(idx), dtype=bool)
+        keep[1:-1] = ~interior | (turn == sign)
+        if keep.all():
+            return idx
+        idx = idx[keep]
+
+    # pathological inputs: finish the sets that are still changing with
+    # the plain stack scan
+    sid = setOf[idx]
+    starts, ends = setBoundaries(sid)
+    startPos = np.flatnonzero(starts)
+    endPos = np.flatnonzero(ends) + 1
+    pieces = []
+    for lo, hi in zip(startPos.tolist(), endPos.tolist()):
+        part = idx[lo:hi]
+        if hi - lo > 2:
+            part = part[chainScan(xs[part].tolist(), ys[part].tolist(), sign)]
+        pieces.append(part)
+    return np.concatenate(pieces)
+
+
+def segmentExtreme(values, setOf, starts, nsets, ufunc):
+    # index of one point per set where values hits the set's max (or min)
+    best = np.zeros(nsets)
+    best[setOf[starts]] = ufunc.reduceat(values, starts)
+    hits = np.flatnonzero(values == best[setOf])
+    first = np.ones(len(hits), dtype=bool)
+    first[1:] = setOf[hits[1:]] != setOf[hits[:-1]]
+    pick = np.zeros(nsets, dtype=np.intp)
+    pick[setOf[hits[first]]] = hits[first]
+    return pick
+
+
+def cullSets(xs, ys, setOf, offsets, nsets):
+    # Akl-Toussaint per set: drop points strictly inside the octagon of
+    # their own set's extreme points.  Edges that collapse to a point (two
+    # extremes at the same point) are skipped.  Input order is kept, so the
+    # survivors stay grouped by set.
+    sizes = np.diff(offsets)
+    starts = offsets[:-1][sizes > 0]
+    s = xs + ys
+    d = xs - ys
+    # counter-clockwise: E, NE, N, NW, W, SW, S, SE
+    corners = [segmentExtreme(xs, setOf, starts, nsets, np.maximum),
+               segmentExtreme(s, setOf, starts, nsets, np.maximum),
+               segmentExtreme(ys, setOf, starts, nsets, np.maximum),
+               segmentExtreme(d, setOf, starts, nsets, np.minimum),
+               segmentExtreme(xs, setOf, starts, nsets, np.minimum),
+               segmentExtreme(s, setOf, starts, nsets, np.minimum),
+               segmentExtreme(ys, setOf, starts, nsets, np.minimum),
+               segmentExtreme(d, setOf, starts, nsets, np.maximum)]
+    # Most points fall in a box that sits inside their set's octagon and are
+    # dropped with four comparisons; only the rest get the edge tests.
+    midX, midY, halfW, halfH = innerBoxes(xs, ys, corners)
+    inBox = (np.abs(xs - midX[setOf]) < halfW[setOf]) & (np.abs(ys - midY[setOf]) < halfH[setOf])
+    candidates = np.flatnonzero(~inBox)
+    inside = insideOctagons(xs, ys, corners, xs[candidates], ys[candidates], setOf[candidates])
+    return candidates[~inside]
+
+
+def insideOctagons(xs, ys, corners, px, py, pset):
+    # A filter only has to be safe, not exact: a point counts as inside only
+    # when the float turn clears the rounding bound, anything closer is kept.
+    realEdges = np.zeros(len(corners[0]), dtype=np.intp)
+    for k in range(8):
+        a = corners[k]
+        b = corners[(k + 1) % 8]
+        realEdges += (xs[a] != xs[b]) | (ys[a] != ys[b])
+    # a set whose extremes are all one point has no inside at all
+    inside = realEdges[pset] >= 3
+    for k in range(8):
+        a = corners[k]
+        b = corners[(k + 1) % 8]
+        ex = (xs[b] - xs[a])[pset]
+        ey = (ys[b] - ys[a])[pset]
+        dx = px - xs[a][pset]
+        dy = py - ys[a][pset]
+        detLeft = ex * dy
+        detRight = ey * dx
+        # collapsed edges have ex == ey == 0 and are skipped
+        inside &= ((detLeft - detRight > CCW_ERRBOUND * (np.abs(detLeft) + np.abs(detRight)))
+                   | ((ex == 0) & (ey == 0)))
+    return inside
+
+
+def innerBoxes(xs, ys, corners):
+    # per set, the box the octagon corners suggest, shrunk about its centre
+    # until its own corners are inside; sets where that fails get no box
+    cx = [xs[c] for c in corners]
+    cy = [ys[c] for c in corners]
+    left = np.maximum(np.maximum(cx[3], cx[4]), cx[5])
+    right = np.minimum(np.minimum(cx[1], cx[0]), cx[7])
+    bottom = np.maximum(np.maximum(cy[5], cy[6]), cy[7])
+    top = np.minimum(np.minimum(cy[1], cy[2]), cy[3])
+    midX = (left + right) / 2
+    midY = (bottom + top) / 2
+    halfW = np.maximum(right - left, 0) / 2
+    halfH = np.maximum(top - bottom, 0) / 2
+    sets = np.arange(len(midX))
+    ok = np.zeros(len(midX), dtype=bool)
+    for _ in range(8):
+        ok = np.ones(len(midX), dtype=bool)
+        for sx, sy in ((-1, -1), (1, -1), (1, 1), (-1, 1)):
+            ok &= insideOctagons(xs, ys, corners, midX + sx * halfW, midY + sy * halfH, sets)
+        if ok.all():
+            break
+        halfW = np.where(ok, halfW, halfW * 0.75)
+        halfH = np.where(ok, halfH, halfH * 0.75)
+    return midX, midY, np.where(ok, halfW, 0), np.where(ok, halfH, 0)
+
+
+def sortSets(xs, ys, setOf):
+    # argsort on x, then a stable (radix) sort on the set ids; lexsort with
+    # three keys is several times slower and only needed when some set
+    # repeats an x value
+    order = np.argsort(xs)
+    order = order[np.argsort(setOf[order], kind='stable')]
+    sx = xs[order]
+    sid = setOf[order]
+    if np.any((sx[1:] == sx[:-1]) & (sid[1:] == sid[:-1])):
+        order = np.lexsort((ys, xs, setOf))
+    return order
+
+
+def compute_hulls_batch(points, offsets, prefilter=True):
+    # Returns (hull, hullOffsets): hull holds indices into points, set k's
+    # hull being hull[hullOffsets[k]:hullOffsets[k + 1]] in the mergeHulls
+    # order (leftmost point, upper chain, lower chain back).
+    pts = toPointArray(points)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    nsets = len(offsets) - 1
+    if nsets < 0 or offsets[0] != 0 or offsets[-1] != len(pts) or np.any(np.diff(offsets) < 0):
+        raise ValueError('offsets must rise from 0 to len(points)')
+    xs = pts[:, 0]
+    ys = pts[:, 1]
+    setOf = np.repeat(np.arange(nsets), np.diff(offsets))
+
+    # one sort on (set, x, y) lines every set up for its monotone chain;
+    # repeated points inside a set are dropped; with no points at all there
+    # are no extremes for the cull to reduce over
+    if prefilter and len(pts) > 0:
+        order = cullSets(xs, ys, setOf, offsets, nsets)
+        order = order[sortSets(xs[order], ys[order], setOf[order])]
+    else:
+        order = sortSets(xs, ys, setOf)
+    sid = setOf[order]
+    if len(order) > 1:
+        repeat = (sid[1:] == sid[:-1]) & (xs[order[1:]] == xs[order[:-1]]) & (ys[order[1:]] == ys[order[:-1]])
+        order = order[np.concatenate(([True], ~repeat))]
+        sid = setOf[order]
+    starts, ends = setBoundaries(sid)
+
+    # split each set by the line from its first to its last point
+    firstOf = order[np.flatnonzero(starts)][np.cumsum(starts) - 1]
+    lastOf = order[np.flatnonzero(ends)][np.cumsum(starts) - 1]
+    side = orientSigns(xs[firstOf], ys[firstOf], xs[lastOf], ys[lastOf], xs[order], ys[order])
+    upper = batchChains(xs, ys, setOf, order[(side > 0) | starts | ends], -1)
+    lower = batchChains(xs, ys, setOf, order[(side < 0) | starts | ends], 1)
+
+    # assemble per set: the upper chain, then the lower chain reversed
+    # without its end points
+    lowerSid = setOf[lower]
+    lowStarts, lowEnds = setBoundaries(lowerSid)
+    inner = ~(lowStarts | lowEnds)
+    lowerInner = lower[inner]
+    parts = np.concatenate((upper, lowerInner))
+    partSet = np.concatenate((setOf[upper], setOf[lowerInner]))
+    partKind = np.concatenate((np.zeros(len(upper), dtype=np.intp), np.ones(len(lowerInner), dtype=np.intp)))
+    # positions count up along the upper chain and down along the lower one
+    partPos = np.concatenate((np.arange(len(upper)), -np.arange(len(lowerInner))))
+    hull = parts[np.lexsort((partPos, partKind, partSet))]
+
+    hullOffsets = np.zeros(nsets + 1, dtype=np.intp)
+    np.cumsum(np.bincount(setOf[hull], minlength=nsets), out=hullOffsets[1:])
+    return hull, hullOffsets
@@ -8,193 +8,75 @@ else:
 
 import time
 
+import numpy as np
+
+# The geometry lives in hull_core, which does not need Qt; this class only
+# adapts QPointF input and QLineF output for the GUI.
+from hull_core import HullTracer, computeHull
+
+
+class DisplayTracer(HullTracer):
+    # draws divide and conquer events on the GUI's view: base cases in red,
+    # as the solver always has, and merged sub-hulls in green when asked for
+    def __init__(self, display, points, maxDepth=None, showMerges=False):
+        super().__init__(maxDepth)
+        self.display = display
+        self.points = points
+        self.showMerges = showMerges
+
+    def outline(self, vertices):
+        pts = [self.points[i] for i in vertices]
+        count = len(pts) if len(pts) > 2 else len(pts) - 1
+        return [QLineF(pts[i], pts[(i + 1) % len(pts)]) for i in range(count)]
+
+    def baseCase(self, depth, vertices):
+        self.display.addLines(self.outline(vertices), (255, 0, 0))
+
+    def merged(self, depth, vertices):
+        if self.showMerges:
+            self.display.addLines(self.outline(vertices), (0, 160, 0))
+
 
 
 class ConvexHullSolver:
-    def __init__( self, display ):
+    def __init__( self, display, algorithm='divide_conquer', prefilter=True, trace=False, traceDepth=None, showMerges=False ):
         self.points = None
+        self.stats = {}
         self.gui_display = display
-
-    def findRightMostPoint(self, hull):
-        rightmost = -10
-        index = 0
-        for i in range(len(hull)):
-            if(hull[i].x() > rightmost):
-                rightmost = hull[i].x()
-                index = i
-        return index
-
-    def findLeftMostPoint(self, hull):
-        leftmost = 10
-        index = 0
-        for i in range(len(hull)):
-            if (hull[i].x() < leftmost):
-                leftmost = hull[i].x()
-                index = i
-        return index
-
-
-    def angleBetween(self, point1, point2):
-        return ((point2.y() - point1.y()) / (point2.x() - point1.x()))
-
-    def getUpperTangents(self, leftHull, rightHull, rightmostIndex, leftmostIndex):
-        upperTangents = [0,0]
-        curUpperLeftTangent = rightmostIndex
-        curUpperRightTangent = leftmostIndex
-        while(True):
-            #Do right top first:
-            newUpperRightTangent = self.upperRight(leftHull, rightHull, curUpperLeftTangent, curUpperRightTangent)
-            newUpperLeftTangent = self.upperLeft(leftHull, rightHull, curUpperLeftTangent, curUpperRightTangent)
-            if (curUpperRightTangent == newUpperRightTangent and curUpperLeftTangent == newUpperLeftTangent):
-                break
-            curUpperRightTangent = newUpperRightTangent
-            curUpperLeftTangent = newUpperLeftTangent
-        upperTangents[0] = curUpperRightTangent
-        upperTangents[1] = curUpperLeftTangent
-        return upperTangents
-
-
-    def upperRight(self, leftHull, rightHull, rightmostIndex, leftmostIndex):
-        i = 0
-        curAngle = self.angleBetween(leftHull[rightmostIndex], rightHull[leftmostIndex])
-        while(True):
-            nextAngle = self.angleBetween(leftHull[rightmostIndex], rightHull[(leftmostIndex+i+1) % len(rightHull)])
-            if(nextAngle < curAngle):
-                break
-            i = i + 1
-            curAngle = nextAngle
-        return ((leftmostIndex+i))
-
-    def upperLeft(self, leftHull, rightHull, rightmostIndex, leftmostIndex):
-        curAngle = self.angleBetween(leftHull[rightmostIndex], rightHull[leftmostIndex])
-        i = 0
-        localAngle = curAngle
-        while (True):
-            nextAngle = self.angleBetween(leftHull[((rightmostIndex - i - 1) % len(leftHull))], rightHull[leftmostIndex])
-            if (nextAngle > localAngle):
-                break
-            i = i + 1
-            localAngle = nextAngle
-        return (rightmostIndex - (i)) % len(leftHull)
-
-    def getLowerTangents(self, leftHull, rightHull, rightmostIndex, leftmostIndex):
-        lowerTangents = [0,0]
-        curLowerLeftTangent = rightmostIndex
-        curLowerRightTangent = leftmostIndex
-        while(True):
-            #Do right top first:
-            newLowerRightTangent = self.lowerRight(leftHull, rightHull, curLowerLeftTangent, curLowerRightTangent)
-            newLowerLeftTangent = self.lowerLeft(leftHull, rightHull, curLowerLeftTangent, curLowerRightTangent)
-            if (curLowerRightTangent == newLowerRightTangent and curLowerLeftTangent == newLowerLeftTangent):
-                break
-            curLowerRightTangent = newLowerRightTangent
-            curLowerLeftTangent = newLowerLeftTangent
-        lowerTangents[0] = curLowerRightTangent
-        lowerTangents[1] = curLowerLeftTangent
-        return lowerTangents
-
-
-    def lowerRight(self, leftHull, rightHull, rightmostIndex, leftmostIndex):
-        curAngle = self.angleBetween(leftHull[rightmostIndex], rightHull[leftmostIndex])
-        i = 0
-        while(True):
-            nextAngle = self.angleBetween(leftHull[rightmostIndex], rightHull[((leftmostIndex -i - 1) % len(rightHull))])
-            if(nextAngle > curAngle):
-                break
-            i = i + 1
-            curAngle = nextAngle
-        return ((leftmostIndex - i)) % len(rightHull)
-
-    def lowerLeft(self, leftHull, rightHull, rightmostIndex, leftmostIndex):
-        curAngle = self.angleBetween(leftHull[rightmostIndex], rightHull[leftmostIndex])
-        i = 0
-        while (True):
-            nextAngle = self.angleBetween(leftHull[((rightmostIndex + i + 1) % len(leftHull))], rightHull[leftmostIndex])
-            if (nextAngle < curAngle):
-                break
-            i = i + 1
-            curAngle = nextAngle
-        return ((rightmostIndex + i) % len(leftHull))
-
-    def mergeHulls(self, leftHull, rightHull):
-        rightmostIndex = self.findRightMostPoint(leftHull)
-        leftmostIndex = self.findLeftMostPoint(rightHull)
-        uppers = self.getUpperTangents(leftHull, rightHull, rightmostIndex, leftmostIndex)
-        rightUpper = uppers[0]
-        leftUpper = uppers[1]
-        lowers = self.getLowerTangents(leftHull, rightHull,rightmostIndex, leftmostIndex)
-        rightLower = lowers[0]
-        leftLower = lowers[1]
-
-        newHullPoints = list()
-
-        for i in range(len(leftHull)):
-            newHullPoints.append(leftHull[i])
-            if((i % len(leftHull)) == leftUpper):
-                for j in range(rightUpper, len(rightHull)+rightUpper):
-                    newHullPoints.append(rightHull[j % len(rightHull)])
-                    if ((j % len(rightHull)) == rightLower):
-                        for k in range(leftLower, len(leftHull)+leftLower):
-                            if(k % len(leftHull) == 0):
-                                break
-                            newHullPoints.append(leftHull[k % len(leftHull)])
-                        break
-                break
-
-        return newHullPoints
-
-    def convexHullRecurse(self, points):
-        if (len(points) == 3):
-            hull = [QLineF(points[i], points[(i + 1) % len(points)]) for i in range(len(points))]
-
-            assert (type(hull) == list and type(hull[0]) == QLineF)
-            self.gui_display.addLines(hull, (255, 0, 0))
-            returnList = [points[i] for i in range(len(points))]
-            if(self.angleBetween(returnList[0],returnList[1]) < self.angleBetween(returnList[0],returnList[2])):
-                temp = returnList[1]
-                returnList[1] = returnList[2]
-                returnList[2] = temp
-            return returnList
-        elif (len(points) == 2):
-            hull = [QLineF(points[i], points[(i + 1) % len(points)]) for i in range(len(points)-1)]
-            assert (type(hull) == list and type(hull[0]) == QLineF)
-            self.gui_display.addLines(hull, (255, 0, 0))
-            return [points[i] for i in range(len(points))]
-
-        leftHull = self.convexHullRecurse(points[:(len(points) // 2)])
-        rightHull = self.convexHullRecurse(points[(len(points) // 2):])
-
-        mergedHull = self.mergeHulls(leftHull, rightHull)
-        return mergedHull
-
-
-    def compute_hull( self, unsorted_points ):
+        # any key of HULL_ALGORITHMS; prefilter culls points inside the
+        # Akl-Toussaint octagon before the hull algorithm runs
+        self.algorithm = algorithm
+        self.prefilter = prefilter
+        # drawing the recursion is off unless asked for; traceDepth limits
+        # it to the top levels (None draws every level)
+        self.trace = trace
+        self.traceDepth = traceDepth
+        self.showMerges = showMerges
+
+    def compute_hull( self, unsorted_points, assume_sorted=False ):
+        # assume_sorted promises the points already come in (x, y) order;
+        # sorted input is also detected, in one pass, without the promise
         assert( type(unsorted_points) == list and type(unsorted_points[0]) == QPointF )
 
         n = len(unsorted_points)
         print( 'Computing Hull for set of {} points'.format(n) )
 
         t1 = time.time()
-        # xpts = unsorted_points.sort(lambda p: p.x())
-        unsorted_points.sort(key=lambda p: p.x())
+        coords = np.array([(p.x(), p.y()) for p in unsorted_points], dtype=np.float64)
         t2 = time.time()
-        print('Time Elapsed (Sorting): {:3.3f} sec'.format(t2-t1))
+        print('Time Elapsed (Converting): {:3.3f} sec'.format(t2-t1))
 
         t3 = time.time()
-
-        newHullPoints = self.convexHullRecurse(unsorted_points)
+        tracer = DisplayTracer(self.gui_display, unsorted_points, self.traceDepth, self.showMerges) if self.trace else None
+        self.stats = {}
+        hullIndices = computeHull(coords, self.algorithm, self.prefilter, tracer, assume_sorted, self.stats)
+        newHullPoints = [unsorted_points[i] for i in hullIndices]
         hull = [QLineF(newHullPoints[i], newHullPoints[(i + 1) % len(newHullPoints)]) for i in range(len(newHullPoints))]
-
         t4 = time.time()
 
-        if(hull is None):
-            hull = [QLineF(unsorted_points[i], unsorted_points[(i + 1) % 3]) for i in range(3)]
-            assert (type(hull) == list and type(hull[0]) == QLineF)
-            assert (type(hull) == list and type(hull[0]) == QLineF)
-
         self.gui_display.addLines(hull, (0, 0, 255))
 
-
+        print('Time Elapsed (Sorting): {:3.3f} sec'.format(self.stats['sort_time']))
         print('Time Elapsed (Convex Hull): {:3.3f} sec'.format(t4-t3))
         self.gui_display.displayStatusText('Time Elapsed (Convex Hull): {:3.3f} sec'.format(t4-t3))
 
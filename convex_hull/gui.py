@@ -1,10 +1,8 @@
 #!/usr/bin/python3
 
 import math
-import random
 import signal
 import sys
-import time
 
 
 from which_pyqt import PYQT_VER
@@ -20,6 +18,7 @@ else:
 
 # Import in the code with the actual implementation
 from convex_hull import *
+from point_generators import generatePoints
 
 
 class PointLineView( QWidget ):
@@ -94,57 +93,36 @@ class Proj2GUI( QMainWindow ):
 
         self.points = None
         self.initUI()
-        self.solver = ConvexHullSolver( self.view )
+        # the GUI is where watching the recursion is worth its cost; the
+        # prefilter stays off so the base cases cover the whole cloud, as
+        # they always have, not just the few points past the octagon
+        self.solver = ConvexHullSolver( self.view, prefilter=False, trace=True )
 
        
     def newPoints(self):
 
-                if self.randBySeed.isChecked():
+        if self.randBySeed.isChecked():
             if (self.randSeed.text().isdigit()):
                 seed = int(self.randSeed.text())
             else:
                 return None
-            random.seed( seed )
         else: # do by time
-            random.seed( time.time() )
+            seed = None
 
-        ptlist = []
-        unique_xvals = {}
-        max_r  = 0.98
-        WIDTH  = 1.0
-        HEIGHT = 1.0
         if(self.npoints.text().isdigit()):
             npoints = int(self.npoints.text())
         else:
             return None
         if self.distribOval.isChecked():
-            while len(ptlist) < npoints:
-                x = random.uniform(-1.0,1.0)
-                y = random.uniform(-1.0,1.0)
-                if x**2+y**2 <= max_r**2:
-                    xval = WIDTH*x
-                    yval = HEIGHT*y
-                    if not xval in unique_xvals:
-                        ptlist.append( QPointF(xval,yval) )
-                        unique_xvals[xval] = 1
+            distribution = 'oval'
         elif self.distribSphere.isChecked():
-            while len(ptlist) < npoints:
-                x = random.uniform(-1.0,1.0)
-                y = random.uniform(-1.0,1.0)
-                z = random.uniform(-1.0,1.0)
-                if x**2 + y**2 + z**2 <= max_r**2:
-                    xval = WIDTH*x
-                    yval = HEIGHT*y
-                    if not xval in unique_xvals:
-                        ptlist.append( QPointF(xval,yval) )
-                        unique_xvals[xval] = 1
+            distribution = 'sphere'
         elif self.distribGaussian.isChecked():
-            while len(ptlist) < npoints:
-                x = random.gauss(0.0,0.25)
-                y = random.gauss(0.0,0.25)
-                if x**2+y**2 <= max_r**2:
-                    ptlist.append( QPointF(WIDTH*x, HEIGHT*y) )
-        return ptlist
+            distribution = 'gaussian'
+        else:
+            return []
+        pts = generatePoints(distribution, npoints, seed)
+        return [QPointF(x, y) for x, y in pts.tolist()]
 
     def clearClicked(self):
         #print('clearClicked')
@@ -0,0 +1,297 @@
+#!/usr/bin/python3
+
+# Three dimensional hulls, for the volumetric data the sphere distribution
+# stands in for.  Points come in as an (N, 3) array and the hull comes back
+# as triangle faces, an (F, 3) array of indices into that input, each face
+# counter-clockwise when seen from outside (right-handed normals point out).
+#
+# The engine is quickhull: every face keeps the set of points strictly
+# outside it, the farthest of them is added next, the faces it sees are
+# replaced by a cone over their horizon, and only their points are handed
+# on to the new faces.  Coplanar facets come out triangulated.
+
+from fractions import Fraction
+
+import numpy as np
+
+from hull_core import EPSILON
+
+
+def toPointArray3D(points):
+    pts = np.asarray(points, dtype=np.float64)
+    if pts.size == 0:
+        pts = pts.reshape(0, 3)
+    if pts.ndim != 2 or pts.shape[1] != 3:
+        raise ValueError('Expected (x, y, z) triples or an (N, 3) array, got shape {}'.format(pts.shape))
+    return pts
+
+
+# The one predicate: the sign of det[b - a, c - a, d - a], positive when d
+# lies on the side the right-handed normal of triangle abc points to.  As in
+# 2D, the float result is trusted past Shewchuk's orient3d error bound and
+# recomputed with fractions otherwise.
+
+O3D_ERRBOUND = (7.0 + 56.0 * EPSILON) * EPSILON
+
+
+def orient3dExact(ax, ay, az, bx, by, bz, cx, cy, cz, dx, dy, dz):
+    ax, ay, az = Fraction(ax), Fraction(ay), Fraction(az)
+    ux, uy, uz = Fraction(bx) - ax, Fraction(by) - ay, Fraction(bz) - az
+    vx, vy, vz = Fraction(cx) - ax, Fraction(cy) - ay, Fraction(cz) - az
+    wx, wy, wz = Fraction(dx) - ax, Fraction(dy) - ay, Fraction(dz) - az
+    return ux * (vy * wz - vz * wy) + uy * (vz * wx - vx * wz) + uz * (vx * wy - vy * wx)
+
+
+def orient3d(a, b, c, d):
+    # a, b, c, d are (x, y, z) tuples; returns -1, 0 or 1
+    adx, ady, adz = a[0] - d[0], a[1] - d[1], a[2] - d[2]
+    bdx, bdy, bdz = b[0] - d[0], b[1] - d[1], b[2] - d[2]
+    cdx, cdy, cdz = c[0] - d[0], c[1] - d[1], c[2] - d[2]
+    bdxcdy, cdxbdy = bdx * cdy, cdx * bdy
+    cdxady, adxcdy = cdx * ady, adx * cdy
+    adxbdy, bdxady = adx * bdy, bdx * ady
+    # Shewchuk's orient3d, which has the opposite sign to ours
+    det = adz * (bdxcdy - cdxbdy) + bdz * (cdxady - adxcdy) + cdz * (adxbdy - bdxady)
+    bound = O3D_ERRBOUND * ((abs(bdxcdy) + abs(cdxbdy)) * abs(adz)
+                            + (abs(cdxady) + abs(adxcdy)) * abs(bdz)
+                            + (abs(adxbdy) + abs(bdxady)) * abs(cdz))
+    if det > bound:
+        return -1
+    if -det > bound:
+        return 1
+    exact = orient3dExact(*a, *b, *c, *d)
+    return (exact > 0) - (exact < 0)
+
+
+def orient3dSigns(ax, ay, az, bx, by, bz, cx, cy, cz, dx, dy, dz):
+    # vectorized orient3d() on broadcasting coordinate arrays; returns the
+    # float determinant in our sign convention (for ranking) and exact signs
+    adx, ady, adz = ax - dx, ay - dy, az - dz
+    bdx, bdy, bdz = bx - dx, by - dy, bz - dz
+    cdx, cdy, cdz = cx - dx, cy - dy, cz - dz
+    bdxcdy, cdxbdy = bdx * cdy, cdx * bdy
+    cdxady, adxcdy = cdx * ady, adx * cdy
+    adxbdy, bdxady = adx * bdy, bdx * ady
+    det = -(adz * (bdxcdy - cdxbdy) + bdz * (cdxady - adxcdy) + cdz * (adxbdy - bdxady))
+    bound = O3D_ERRBOUND * ((np.abs(bdxcdy) + np.abs(cdxbdy)) * np.abs(adz)
+                            + (np.abs(cdxady) + np.abs(adxcdy)) * np.abs(bdz)
+                            + (np.abs(adxbdy) + np.abs(bdxady)) * np.abs(cdz))
+    signs = np.sign(det).astype(np.int8)
+    unsure = np.abs(det) <= bound
+    if np.any(unsure):
+        args = [np.broadcast_to(v, det.shape)[unsure].tolist()
+                for v in (ax, ay, az, bx, by, bz, cx, cy, cz, dx, dy, dz)]
+        exact = [orient3dExact(*coords) for coords in zip(*args)]
+        signs[unsure] = [(e > 0) - (e < 0) for e in exact]
+    return det, signs
+
+
+# points tested against a set of faces at a time
+FILTER_CHUNK = 1 << 16
+
+
+class QuickHull3D:
+    # Faces live in a dict keyed by face id, with each directed edge mapped
+    # to the face that holds it, so the face across edge (u, v) is the one
+    # holding (v, u).
+
+    def __init__(self, points):
+        self.points = points
+        self.xs = points[:, 0]
+        self.ys = points[:, 1]
+        self.zs = points[:, 2]
+        self.faces = {}         # face id -> (a, b, c)
+        self.edgeFace = {}      # directed edge (u, v) -> face id
+        self.outside = {}       # face id -> (point ids, heights) strictly outside it
+        self.pending = []       # faces that may have points outside
+        self.coords = {}        # vertex id -> (x, y, z), hull vertices only
+        self.nextFace = 0
+
+    def coord(self, i):
+        c = self.coords.get(i)
+        if c is None:
+            c = self.coords[i] = tuple(self.points[i].tolist())
+        return c
+
+    def addFace(self, a, b, c):
+        fid = self.nextFace
+        self.nextFace += 1
+        self.faces[fid] = (a, b, c)
+        self.edgeFace[(a, b)] = fid
+        self.edgeFace[(b, c)] = fid
+        self.edgeFace[(c, a)] = fid
+        return fid
+
+    def removeFace(self, fid):
+        a, b, c = self.faces.pop(fid)
+        del self.edgeFace[(a, b)], self.edgeFace[(b, c)], self.edgeFace[(c, a)]
+        return self.outside.pop(fid, None)
+
+    def start(self, simplex):
+        # the four vertices of a tetrahedron, any order
+        a, b, c, d = simplex
+        for face, opposite in (((a, b, c), d), ((a, b, d), c), ((a, c, d), b), ((b, c, d), a)):
+            p, q, r = face
+            if orient3d(self.coord(p), self.coord(q), self.coord(r), self.coord(opposite)) > 0:
+                p, q = q, p
+            self.addFace(p, q, r)
+
+    def faceArrays(self, fids):
+        # corner coordinates of the given faces, shaped to broadcast against
+        # a column of points
+        corners = np.array([[self.coord(v) for v in self.faces[f]] for f in fids])
+        return [corners[:, k, j][None, :] for k in range(3) for j in range(3)]
+
+    def assign(self, fids, ids):
+        # hand every point to the first of these faces it is strictly
+        # outside; points outside none of them are inside the hull and go
+        if len(ids) == 0 or not fids:
+            return
+        faceCorners = self.faceArrays(fids)
+        picked = []
+        for start in range(0, len(ids), FILTER_CHUNK):
+            chunk = ids[start:start + FILTER_CHUNK]
+            cols = [v[chunk][:, None] for v in (self.xs, self.ys, self.zs)]
+            heights, signs = orient3dSigns(*faceCorners, *cols)
+            out = signs > 0
+            first = np.argmax(out, axis=1)
+            rows = np.flatnonzero(out[np.arange(len(chunk)), first])
+            picked.append((chunk[rows], first[rows], heights[rows, first[rows]]))
+        ids, first, heights = (np.concatenate(parts) for parts in zip(*picked))
+        order = np.argsort(first, kind='stable')
+        ids, first, heights = ids[order], first[order], heights[order]
+        bounds = np.searchsorted(first, np.arange(len(fids) + 1))
+        for k, fid in enumerate(fids):
+            lo, hi = bounds[k], bounds[k + 1]
+            if hi > lo:
+                self.outside[fid] = (ids[lo:hi], heights[lo:hi])
+                self.pending.append(fid)
+
+    def run(self):
+        while self.pending:
+            fid = self.pending.pop()
+            if fid in self.outside:
+                ids, heights = self.outside[fid]
+                self.addVertex(fid, int(ids[np.argmax(heights)]))
+
+    def addVertex(self, fid, p):
+        # flood out from fid over the faces p sees; the edges where it stops
+        # are the horizon
+        pc = self.coord(p)
+        visible = {fid}
+        hidden = set()
+        stack = [fid]
+        horizon = []
+        while stack:
+            a, b, c = self.faces[stack.pop()]
+            for u, v in ((a, b), (b, c), (c, a)):
+                g = self.edgeFace[(v, u)]
+                if g in visible:
+                    continue
+                if g not in hidden:
+                    ga, gb, gc = self.faces[g]
+                    if orient3d(self.coord(ga), self.coord(gb), self.coord(gc), pc) > 0:
+                        visible.add(g)
+                        stack.append(g)
+                        continue
+                    hidden.add(g)
+                horizon.append((u, v))
+
+        orphans = []
+        for f in visible:
+            out = self.removeFace(f)
+            if out is not None:
+                orphans.append(out[0])
+        newFaces = [self.addFace(u, v, p) for u, v in horizon]
+        if orphans:
+            ids = np.concatenate(orphans)
+            self.assign(newFaces, ids[ids != p])
+
+    def hullFaces(self):
+        return np.array(list(self.faces.values()), dtype=np.intp).reshape(-1, 3)
+
+
+def extremePoints3D(pts):
+    # ids of the points extreme along the axes and the cube diagonals
+    xs, ys, zs = pts[:, 0], pts[:, 1], pts[:, 2]
+    ids = set()
+    for direction in (xs, ys, zs, xs + ys + zs, xs + ys - zs, xs - ys + zs, -xs + ys + zs):
+        ids.add(int(np.argmin(direction)))
+        ids.add(int(np.argmax(direction)))
+    return np.array(sorted(ids), dtype=np.intp)
+
+
+def initialSimplex(pts, ids):
+    # four affinely independent points from ids, spread as far apart as a
+    # float search finds them, or None when ids are all coplanar
+    sub = pts[ids]
+    a = int(np.argmin(sub[:, 0]))
+    dist = ((sub - sub[a]) ** 2).sum(axis=1)
+    b = int(np.argmax(dist))
+    if dist[b] == 0:
+        return None
+    cross = np.cross(sub - sub[a], sub[b] - sub[a])
+    c = int(np.argmax((cross ** 2).sum(axis=1)))
+    heights, signs = orient3dSigns(*sub[a], *sub[b], *sub[c], sub[:, 0], sub[:, 1], sub[:, 2])
+    offPlane = np.flatnonzero(signs)
+    if len(offPlane) == 0:
+        return None
+    d = int(offPlane[np.argmax(np.abs(heights[offPlane]))])
+    return [int(ids[k]) for k in (a, b, c, d)]
+
+
+def insideFaces(core, pts):
+    # Conservative test against the current (closed) hull: True only for
+    # points that are clearly inside every face.  The plane values come from
+    # one matrix product; the tolerance over-covers their rounding error, and
+    # anything within it is kept for the exact assignment.
+    fids = list(core.faces)
+    corners = np.array([[core.coord(v) for v in core.faces[f]] for f in fids])
+    u = corners[:, 1] - corners[:, 0]
+    v = corners[:, 2] - corners[:, 0]
+    normals = np.cross(u, v)
+    offsets = (normals * corners[:, 0]).sum(axis=1)
+    perm = (np.abs(u[:, [1, 2, 0]] * v[:, [2, 0, 1]]) + np.abs(u[:, [2, 0, 1]] * v[:, [1, 2, 0]])).sum(axis=1)
+    scale = max(np.abs(pts).max(), np.abs(corners).max()) if len(pts) else 0.0
+    tolerance = 64 * EPSILON * perm * scale
+    inside = np.empty(len(pts), dtype=bool)
+    for start in range(0, len(pts), FILTER_CHUNK):
+        values = pts[start:start + FILTER_CHUNK] @ normals.T - offsets
+        inside[start:start + FILTER_CHUNK] = (values < -tolerance).all(axis=1)
+    return inside
+
+
+def computeHull3D(points, prefilter=True):
+    # Returns the hull as an (F, 3) array of point indices.  Inputs with
+    # fewer than four affinely independent points have no 3D hull and give
+    # no faces.
+    pts = toPointArray3D(points)
+    empty = np.empty((0, 3), dtype=np.intp)
+    if len(pts) < 4:
+        return empty
+    core = QuickHull3D(pts)
+    everything = np.arange(len(pts))
+    if prefilter:
+        # hull the axis and diagonal extremes first; most points fall inside
+        # that polytope and never reach the per-face bookkeeping
+        seeds = extremePoints3D(pts)
+        simplex = initialSimplex(pts, seeds)
+        if simplex is not None:
+            core.start(simplex)
+            core.assign(list(core.faces), seeds)
+            core.run()
+            candidates = everything[~insideFaces(core, pts)]
+            core.assign(list(core.faces), candidates)
+            core.run()
+            return core.hullFaces()
+    simplex = initialSimplex(pts, everything)
+    if simplex is None:
+        return empty
+    core.start(simplex)
+    core.assign(list(core.faces), everything)
+    core.run()
+    return core.hullFaces()
+
+
+def hullVertices3D(faces):
+    return np.unique(faces)
@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+
+# Headless benchmark for the hull engines over the GUI's point distributions.
+#
+#   python3 hull_benchmark.py --output bench.json
+#   python3 hull_benchmark.py --max-size 1000000 --compare bench.json
+#   python3 hull_benchmark.py --sizes 500 2000 --algorithms monotone_chain
+#
+# Each (distribution, size, algorithm) run records the sort time, the total
+# hull time, peak traced memory and the hull size, and the results are
+# written as JSON.  --dimensions 3 runs the 3D quickhull instead, on the
+# sphere and gaussian draws with z kept.  --compare checks a new run against
+# an older file and lists every run that got slower by more than --tolerance.
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from hull3d import computeHull3D
+from hull_core import HULL_ALGORITHMS, computeHull
+from point_generators import DISTRIBUTIONS, DISTRIBUTIONS_3D, generatePoints
+
+
+SIZES = [10 ** k for k in range(2, 8)]
+HULL3D_ALGORITHM = 'quickhull3d'
+
+
+def timeRun(points, algorithm, prefilter):
+    if algorithm == HULL3D_ALGORITHM:
+        # no separate sort step in 3D
+        t1 = time.perf_counter()
+        faces = computeHull3D(points, prefilter)
+        t2 = time.perf_counter()
+        return 0.0, t2 - t1, len(np.unique(faces))
+    stats = {}
+    hull = computeHull(points, algorithm, prefilter, stats=stats)
+    return stats['sort_time'], stats['hull_time'], len(hull)
+
+
+def peakMemory(points, algorithm, prefilter):
+    # traced separately, tracemalloc slows everything it watches
+    tracemalloc.start()
+    try:
+        if algorithm == HULL3D_ALGORITHM:
+            computeHull3D(points, prefilter)
+        else:
+            computeHull(points, algorithm, prefilter)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def runBenchmark(distributions=DISTRIBUTIONS, sizes=SIZES, algorithms=None, seed=6, repeat=3,
+                 prefilter=True, measureMemory=True, log=None, dimensions=2):
+    if dimensions == 3:
+        algorithms = [HULL3D_ALGORITHM]
+    else:
+        algorithms = algorithms or sorted(HULL_ALGORITHMS)
+    runs = []
+    for distribution in distributions:
+        for size in sizes:
+            t = time.perf_counter()
+            points = generatePoints(distribution, size, seed, dimensions)
+            genTime = time.perf_counter() - t
+            for algorithm in algorithms:
+                timings = [timeRun(points, algorithm, prefilter) for _ in range(repeat)]
+                run = {
+                    'distribution': distribution,
+                    'size': size,
+                    'algorithm': algorithm,
+                    'dimensions': dimensions,
+                    'prefilter': prefilter,
+                    'seed': seed,
+                    'generate_time': genTime,
+                    # best of the repeats, the least noisy figure to compare
+                    'sort_time': min(s for s, _, _ in timings),
+                    'hull_time': min(h for _, h, _ in timings),
+                    'hull_size': timings[0][2],
+                    'peak_memory': peakMemory(points, algorithm, prefilter) if measureMemory else None,
+                }
+                runs.append(run)
+                if log is not None:
+                    log('{distribution:>8} {size:>9} {algorithm:>15}  sort {sort_time:8.4f}s  '
+                        'hull {hull_time:8.4f}s  h={hull_size}'.format(**run))
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'runs': runs,
+    }
+
+
+def compareResults(old, new, tolerance=0.25, minTime=0.001):
+    # runs more than tolerance slower than before, ignoring ones too short
+    # to time reliably and any whose hull size changed (those are reported
+    # too, a different answer is worse than a slow one)
+    key = lambda r: (r['distribution'], r['size'], r['algorithm'], r.get('dimensions', 2), r['prefilter'], r['seed'])
+    before = {key(r): r for r in old['runs']}
+    problems = []
+    for run in new['runs']:
+        prev = before.get(key(run))
+        if prev is None:
+            continue
+        if prev['hull_size'] != run['hull_size']:
+            problems.append((run, prev, 'hull size {} -> {}'.format(prev['hull_size'], run['hull_size'])))
+        if max(prev['hull_time'], run['hull_time']) >= minTime and run['hull_time'] > prev['hull_time'] * (1 + tolerance):
+            problems.append((run, prev, 'hull time {:.4f}s -> {:.4f}s'.format(prev['hull_time'], run['hull_time'])))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the convex hull engines.')
+    parser.add_argument('--dimensions', type=int, default=2, choices=[2, 3])
+    parser.add_argument('--distributions', nargs='+', choices=DISTRIBUTIONS)
+    parser.add_argument('--algorithms', nargs='+', default=sorted(HULL_ALGORITHMS), choices=sorted(HULL_ALGORITHMS))
+    parser.add_argument('--min-size', type=int, default=SIZES[0])
+    parser.add_argument('--max-size', type=int, default=SIZES[-1])
+    parser.add_argument('--sizes', nargs='+', type=int, help='exact sizes, instead of the powers of ten '
+                        'from --min-size to --max-size')
+    parser.add_argument('--seed', type=int, default=6)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-prefilter', action='store_true')
+    parser.add_argument('--no-memory', action='store_true')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='earlier JSON results to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+    distributions = args.distributions or (DISTRIBUTIONS_3D if args.dimensions == 3 else DISTRIBUTIONS)
+    if args.dimensions == 3 and not set(distributions) <= set(DISTRIBUTIONS_3D):
+        parser.error('3D runs support the distributions {}'.format(DISTRIBUTIONS_3D))
+
+    if args.sizes:
+        if min(args.sizes) < 1:
+            parser.error('--sizes must all be positive')
+        sizes = args.sizes
+    else:
+        for name, size in (('--min-size', args.min_size), ('--max-size', args.max_size)):
+            if size < 1 or 10 ** round(math.log10(size)) != size:
+                parser.error('{} must be a power of ten, got {}; use --sizes for other sizes'.format(name, size))
+        sizes = [10 ** k for k in range(round(math.log10(args.min_size)), round(math.log10(args.max_size)) + 1)]
+    results = runBenchmark(distributions, sizes, args.algorithms, args.seed, args.repeat,
+                           not args.no_prefilter, not args.no_memory, log=print, dimensions=args.dimensions)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        problems = compareResults(old, results, args.tolerance)
+        for run, prev, what in problems:
+            print('REGRESSION {distribution} {size} {algorithm}: '.format(**run) + what)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
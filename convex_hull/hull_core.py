@@ -0,0 +1,572 @@
+#!/usr/bin/python3
+
+# Headless convex hull core.  Nothing in here imports Qt, so batch jobs can
+# compute hulls on machines without a display.  Points come in as (x, y)
+# tuples or an (N, 2) array and hulls come back as vertex indices into that
+# input, in the same order ConvexHullSolver.mergeHulls has always produced:
+# starting at the leftmost point and walking over the upper chain first.
+
+import sys
+import time
+from fractions import Fraction
+
+import numpy as np
+
+
+def toPointArray(points):
+    pts = np.asarray(points, dtype=np.float64)
+    if pts.size == 0:
+        pts = pts.reshape(0, 2)
+    if pts.ndim != 2 or pts.shape[1] != 2:
+        raise ValueError('Expected (x, y) pairs or an (N, 2) array, got shape {}'.format(pts.shape))
+    return pts
+
+
+# Orientation predicates.  Every hull decision is the sign of
+# cross(b - a, c - a): positive for a counter-clockwise (left) turn, negative
+# for clockwise, zero for collinear.  The float result is trusted when it
+# clears Shewchuk's error bound; otherwise the sign is recomputed exactly with
+# fractions, which only happens for nearly collinear triples.
+
+EPSILON = 2.0 ** -53
+CCW_ERRBOUND = (3.0 + 16.0 * EPSILON) * EPSILON
+
+
+def crossExact(ax, ay, bx, by, cx, cy):
+    ax, ay = Fraction(ax), Fraction(ay)
+    return (Fraction(bx) - ax) * (Fraction(cy) - ay) - (Fraction(by) - ay) * (Fraction(cx) - ax)
+
+
+def orient(ax, ay, bx, by, cx, cy):
+    detLeft = (bx - ax) * (cy - ay)
+    detRight = (by - ay) * (cx - ax)
+    det = detLeft - detRight
+    bound = CCW_ERRBOUND * (abs(detLeft) + abs(detRight))
+    if det > bound:
+        return 1
+    if -det > bound:
+        return -1
+    if ((bx == ax or cy == ay) and (by == ay or cx == ax)) or (cx == bx and cy == by):
+        # a zero factor in both products, or c is b: exactly collinear
+        return 0
+    exact = crossExact(ax, ay, bx, by, cx, cy)
+    return (exact > 0) - (exact < 0)
+
+
+def orientSigns(ax, ay, bx, by, cx, cy):
+    # vectorized orient(); arguments broadcast like any numpy expression
+    detLeft = (bx - ax) * (cy - ay)
+    detRight = (by - ay) * (cx - ax)
+    det = detLeft - detRight
+    signs = np.sign(det).astype(np.int8)
+    unsure = np.abs(det) <= CCW_ERRBOUND * (np.abs(detLeft) + np.abs(detRight))
+    if np.any(unsure):
+        unsure &= ~((((bx == ax) | (cy == ay)) & ((by == ay) | (cx == ax))) | ((cx == bx) & (cy == by)))
+    if np.any(unsure):
+        args = [np.broadcast_to(v, det.shape)[unsure].tolist() for v in (ax, ay, bx, by, cx, cy)]
+        signs[unsure] = [orient(*triple) for triple in zip(*args)]
+    return signs
+
+
+def isLexBefore(xs, ys, a, b):
+    return xs[a] < xs[b] or (xs[a] == xs[b] and ys[a] < ys[b])
+
+
+class HullTracer:
+    # Divide and conquer events for anyone who wants to watch the recursion,
+    # e.g. the GUI drawing sub-hulls.  Override the events you care about.
+    # Events are only raised down to maxDepth (0 is the final merge, None is
+    # every level), and with no tracer at all the recursion pays one integer
+    # comparison per call.
+
+    def __init__(self, maxDepth=None):
+        self.maxDepth = maxDepth
+
+    def baseCase(self, depth, vertices):
+        pass
+
+    def merged(self, depth, vertices):
+        pass
+
+
+class RemappedTracer(HullTracer):
+    # forwards events with vertex ids translated through ids, for when the
+    # hull ran on a subset of the caller's points
+    def __init__(self, tracer, ids):
+        super().__init__(tracer.maxDepth)
+        self.tracer = tracer
+        self.ids = ids
+
+    def baseCase(self, depth, vertices):
+        self.tracer.baseCase(depth, self.ids[vertices].tolist())
+
+    def merged(self, depth, vertices):
+        self.tracer.merged(depth, self.ids[vertices].tolist())
+
+
+class HullCore:
+    # Sub-hulls live as clockwise cycles threaded through two shared link
+    # arrays, nxt and prv, indexed by point id.  A hull is passed around as
+    # its (leftmost, rightmost) pair of ids; the recursion already knows both
+    # from the sorted split, so a merge walks the tangents and then splices
+    # the two cycles together by rewriting four links, with no list building
+    # and no rescans for the extreme points.
+
+    def __init__(self, xs, ys, tracer=None):
+        # plain python floats are much cheaper to index than numpy scalars
+        # in the scalar tangent loops below
+        self.xs = xs
+        self.ys = ys
+        self.tracer = tracer
+        if tracer is None:
+            self.traceDepth = -1
+        elif tracer.maxDepth is None:
+            self.traceDepth = sys.maxsize
+        else:
+            self.traceDepth = tracer.maxDepth
+        self.nxt = list(range(len(xs)))
+        self.prv = list(range(len(xs)))
+
+    def linkHull(self, vertices):
+        # thread a clockwise vertex list (starting at its leftmost point)
+        # into the link arrays
+        nxt = self.nxt
+        prv = self.prv
+        rightmost = vertices[0]
+        for k in range(len(vertices)):
+            a = vertices[k - 1]
+            b = vertices[k]
+            nxt[a] = b
+            prv[b] = a
+            if isLexBefore(self.xs, self.ys, rightmost, b):
+                rightmost = b
+        return (vertices[0], rightmost)
+
+    def hullVertices(self, hull):
+        start = hull[0]
+        vertices = [start]
+        v = self.nxt[start]
+        while v != start:
+            vertices.append(v)
+            v = self.nxt[v]
+        return vertices
+
+    def orient(self, a, b, c):
+        xs = self.xs
+        ys = self.ys
+        return orient(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c])
+
+    def beyond(self, a, b, c):
+        # for collinear a, b, c: does c lie past b, seen from a?
+        xs = self.xs
+        ys = self.ys
+        return (xs[c] - xs[b]) * (xs[b] - xs[a]) + (ys[c] - ys[b]) * (ys[b] - ys[a]) > 0
+
+    def improves(self, a, b, c, turn):
+        # should the tangent a-b swing over to c?  c must be strictly on the
+        # outside (the side given by turn), or collinear and further out so
+        # that b would only be the middle of a straight edge
+        side = self.orient(a, b, c)
+        return side == turn or (side == 0 and self.beyond(a, b, c))
+
+    def getUpperTangents(self, left, right):
+        curLeft = left
+        curRight = right
+        while True:
+            newRight = self.upperRight(curLeft, curRight)
+            newLeft = self.upperLeft(curLeft, curRight)
+            if curRight == newRight and curLeft == newLeft:
+                break
+            curRight = newRight
+            curLeft = newLeft
+        return [curRight, curLeft]
+
+    def upperRight(self, p, q):
+        nxt = self.nxt
+        while self.improves(p, q, nxt[q], 1):
+            q = nxt[q]
+        return q
+
+    def upperLeft(self, p, q):
+        prv = self.prv
+        while self.improves(q, p, prv[p], -1):
+            p = prv[p]
+        return p
+
+    def getLowerTangents(self, left, right):
+        curLeft = left
+        curRight = right
+        while True:
+            newRight = self.lowerRight(curLeft, curRight)
+            newLeft = self.lowerLeft(curLeft, curRight)
+            if curRight == newRight and curLeft == newLeft:
+                break
+            curRight = newRight
+            curLeft = newLeft
+        return [curRight, curLeft]
+
+    def lowerRight(self, p, q):
+        prv = self.prv
+        while self.improves(p, q, prv[q], -1):
+            q = prv[q]
+        return q
+
+    def lowerLeft(self, p, q):
+        nxt = self.nxt
+        while self.improves(q, p, nxt[p], 1):
+            p = nxt[p]
+        return p
+
+    def mergeHulls(self, leftHull, rightHull):
+        # tangents start from the rightmost point of the left hull and the
+        # leftmost point of the right hull, both carried in from the split
+        rightUpper, leftUpper = self.getUpperTangents(leftHull[1], rightHull[0])
+        rightLower, leftLower = self.getLowerTangents(leftHull[1], rightHull[0])
+
+        # clockwise: left hull up to its upper tangent point, across to the
+        # right hull, around it to the lower tangent point, and back across
+        self.nxt[leftUpper] = rightUpper
+        self.prv[rightUpper] = leftUpper
+        self.nxt[rightLower] = leftLower
+        self.prv[leftLower] = rightLower
+        return (leftHull[0], rightHull[1])
+
+    def convexHullRecurse(self, order, lo, hi, depth=0):
+        # hull of order[lo:hi], which is sorted on (x, y) with no repeats
+        n = hi - lo
+        if n > 3:
+            mid = lo + n // 2
+            leftHull = self.convexHullRecurse(order, lo, mid, depth + 1)
+            rightHull = self.convexHullRecurse(order, mid, hi, depth + 1)
+            hull = self.mergeHulls(leftHull, rightHull)
+            if depth <= self.traceDepth:
+                self.tracer.merged(depth, self.hullVertices(hull))
+            return hull
+
+        if n == 3:
+            a, b, c = order[lo], order[lo + 1], order[lo + 2]
+            turn = self.orient(a, b, c)
+            if turn < 0:
+                hull = self.linkHull([a, b, c])
+            elif turn > 0:
+                hull = self.linkHull([a, c, b])
+            else:
+                # collinear, and b sits between a and c in (x, y) order
+                hull = self.linkHull([a, c])
+        else:
+            hull = self.linkHull(order[lo:hi])
+        if depth <= self.traceDepth:
+            self.tracer.baseCase(depth, self.hullVertices(hull))
+        return hull
+
+
+def divideAndConquerHull(points, tracer=None, order=None):
+    pts = toPointArray(points)
+    if len(pts) == 0:
+        return np.empty(0, dtype=np.intp)
+    # ties in x are broken on y and repeated points dropped, so the halves are
+    # always separable and no base case sees a zero-length edge
+    if order is None:
+        order = sortByXY(pts)
+    order = uniqueSorted(pts, np.asarray(order, dtype=np.intp))
+    core = HullCore(pts[:, 0].tolist(), pts[:, 1].tolist(), tracer)
+    hull = core.convexHullRecurse(order.tolist(), 0, len(order))
+    return np.asarray(core.hullVertices(hull), dtype=np.intp)
+
+
+# Vectorized monotone chain.  Sorting and most of the chain work happens in
+# whole-array numpy passes; python only touches the few points that survive.
+
+def turns(xs, ys):
+    # orientation of every consecutive triple a, b, c
+    return orientSigns(xs[:-2], ys[:-2], xs[1:-1], ys[1:-1], xs[2:], ys[2:])
+
+
+def chainScan(xs, ys, sign):
+    # classic stack scan, keeps points that turn strictly in the sign direction
+    stack = []
+    for i in range(len(xs)):
+        while len(stack) >= 2:
+            a, b = stack[-2], stack[-1]
+            if orient(xs[a], ys[a], xs[b], ys[b], xs[i], ys[i]) == sign:
+                break
+            stack.pop()
+        stack.append(i)
+    return stack
+
+
+def monotoneChain(xs, ys, idx, sign, minDropFraction=0.01):
+    # Any point that fails to turn the right way against its current
+    # neighbours lies on or under a chord between two other points, so every
+    # such point can be dropped in the same pass.  Once the passes stop paying
+    # for themselves the survivors go through the ordinary stack scan.
+    # idx must be free of repeated points or both copies would be dropped.
+    while len(idx) > 2:
+        t = turns(xs[idx], ys[idx])
+        keep = np.ones(len(idx), dtype=bool)
+        keep[1:-1] = t * sign > 0
+        dropped = len(idx) - np.count_nonzero(keep)
+        idx = idx[keep]
+        if dropped <= minDropFraction * len(idx):
+            break
+    if len(idx) <= 2:
+        return idx
+    return idx[chainScan(xs[idx].tolist(), ys[idx].tolist(), sign)]
+
+
+def isSortedByXY(pts):
+    # one O(n) pass; data written out in x order skips the sort entirely
+    xs = pts[:, 0]
+    ys = pts[:, 1]
+    if not np.all(xs[1:] >= xs[:-1]):
+        return False
+    return not np.any((xs[1:] == xs[:-1]) & (ys[1:] < ys[:-1]))
+
+
+def sortByXY(pts, assumeSorted=False):
+    # assumeSorted is the caller's promise that pts already runs in (x, y)
+    # order; it is not checked
+    if assumeSorted or isSortedByXY(pts):
+        return np.arange(len(pts))
+    # argsort on x alone is several times faster than lexsort, so only pay
+    # for the tie-break on y when some x value actually repeats
+    order = np.argsort(pts[:, 0])
+    sx = pts[order, 0]
+    if np.any(sx[1:] == sx[:-1]):
+        order = np.lexsort((pts[:, 1], pts[:, 0]))
+    return order
+
+
+def uniqueSorted(pts, order):
+    # drop repeated points from an (x, y) sorted order
+    sx = pts[order, 0]
+    sy = pts[order, 1]
+    repeat = (sx[1:] == sx[:-1]) & (sy[1:] == sy[:-1])
+    if np.any(repeat):
+        order = order[np.concatenate(([True], ~repeat))]
+    return order
+
+
+def monotoneChainHull(points, order=None):
+    pts = toPointArray(points)
+    if order is None:
+        order = sortByXY(pts)
+    order = uniqueSorted(pts, np.asarray(order, dtype=np.intp))
+    if len(order) < 3:
+        return order
+    xs = pts[:, 0]
+    ys = pts[:, 1]
+    first = order[0]
+    last = order[-1]
+
+    # split the presorted points by the line from the leftmost to the
+    # rightmost point; each chain only needs to look at its own side
+    side = orientSigns(xs[first], ys[first], xs[last], ys[last], xs[order], ys[order])
+    upperMask = side > 0
+    lowerMask = side < 0
+    upperMask[0] = upperMask[-1] = lowerMask[0] = lowerMask[-1] = True
+
+    upper = monotoneChain(xs, ys, order[upperMask], -1)
+    lower = monotoneChain(xs, ys, order[lowerMask], 1)
+
+    # same orientation mergeHulls produces: leftmost point, upper chain
+    # left to right, then lower chain back right to left
+    return np.concatenate((upper, lower[-2:0:-1]))
+
+
+# Quickhull, with every partition step done as one numpy pass over the
+# points still outside the current edge.
+
+def leftOf(xs, ys, idx, a, b):
+    return orientSigns(xs[a], ys[a], xs[b], ys[b], xs[idx], ys[idx]) > 0
+
+
+def farthestLeftOf(xs, ys, idx, a, b):
+    # the float distances only pick the contenders; anything within rounding
+    # of the best is settled with exact cross products
+    dist = (xs[b] - xs[a]) * (ys[idx] - ys[a]) - (ys[b] - ys[a]) * (xs[idx] - xs[a])
+    best = dist.max()
+    slack = 4 * CCW_ERRBOUND * (abs(best) + (abs(xs[b] - xs[a]) + abs(ys[b] - ys[a]))
+                                * (np.abs(xs[idx] - xs[a]).max() + np.abs(ys[idx] - ys[a]).max()))
+    near = idx[dist >= best - slack]
+    if len(near) == 1:
+        return near
+    exact = [crossExact(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c]) for c in near.tolist()]
+    top = max(exact)
+    return near[[e == top for e in exact]]
+
+
+def extremePoints(xs, ys):
+    # lowest of the leftmost points and highest of the rightmost points,
+    # the same first and last points an (x, y) sort would give
+    minX = xs.min()
+    maxX = xs.max()
+    left = np.flatnonzero(xs == minX)
+    right = np.flatnonzero(xs == maxX)
+    return left[np.argmin(ys[left])], right[np.argmax(ys[right])]
+
+
+def quickHull(points):
+    pts = toPointArray(points)
+    n = len(pts)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+    xs = pts[:, 0]
+    ys = pts[:, 1]
+    first, last = extremePoints(xs, ys)
+    if xs[first] == xs[last] and ys[first] == ys[last]:
+        return np.asarray([first], dtype=np.intp)
+
+    allIdx = np.arange(n)
+    side = orientSigns(xs[first], ys[first], xs[last], ys[last], xs, ys)
+
+    # Each task is either an edge (a, b) with the points strictly left of it,
+    # or a vertex to emit.  Left of a directed edge is outside for the
+    # clockwise order mergeHulls uses, so the upper chain is walked from
+    # first to last and the lower chain back from last to first.
+    hull = [first]
+    tasks = [(last, first, allIdx[side < 0]), last, (first, last, allIdx[side > 0])]
+    while tasks:
+        task = tasks.pop()
+        if not isinstance(task, tuple):
+            hull.append(task)
+            continue
+        a, b, idx = task
+        if len(idx) == 0:
+            continue
+        far = farthestLeftOf(xs, ys, idx, a, b)
+        # several points can tie for farthest along a line parallel to a-b;
+        # take the one nearest b so the others fall on hull edges, not corners
+        c = far[np.argmax((xs[b] - xs[a]) * xs[far] + (ys[b] - ys[a]) * ys[far])]
+        outAC = idx[leftOf(xs, ys, idx, a, c)]
+        outCB = idx[leftOf(xs, ys, idx, c, b)]
+        tasks.append((c, b, outCB))
+        tasks.append(c)
+        tasks.append((a, c, outAC))
+    return np.asarray(hull, dtype=np.intp)
+
+
+# Akl-Toussaint culling.  The extreme points along x, y and both diagonals
+# span an octagon; anything strictly inside it cannot be on the hull.  For
+# oval and gaussian clouds that removes nearly every point before sorting.
+
+# below this the box search costs more than testing every point's edges
+BOX_MIN_POINTS = 4096
+
+
+def aklToussaintFilter(points):
+    pts = toPointArray(points)
+    n = len(pts)
+    if n < 9:
+        return np.arange(n)
+    xs = np.ascontiguousarray(pts[:, 0])
+    ys = np.ascontiguousarray(pts[:, 1])
+    s = xs + ys
+    d = xs - ys
+    # counter-clockwise around the octagon
+    octagon = [np.argmax(xs), np.argmax(s), np.argmax(ys), np.argmin(d),
+               np.argmin(xs), np.argmin(s), np.argmin(ys), np.argmax(d)]
+    corners = []
+    for i in octagon:
+        if not corners or (xs[i] != xs[corners[-1]] or ys[i] != ys[corners[-1]]):
+            corners.append(i)
+    while len(corners) > 1 and xs[corners[0]] == xs[corners[-1]] and ys[corners[0]] == ys[corners[-1]]:
+        corners.pop()
+    if len(corners) < 3:
+        return np.arange(n)
+
+    # Cheap first pass: points inside a box that sits inside the octagon are
+    # culled with four comparisons, and only the rest need the edge tests.
+    # Start from the box the corners suggest and shrink it about its centre
+    # until all four of its corners are inside.  Corners 0-7 are E, NE, N,
+    # NW, W, SW, S, SE.
+    e, ne, nn, nw, w, sw, ss, se = octagon
+    if n < BOX_MIN_POINTS:
+        return octagonOutside(xs, ys, corners, np.arange(n))
+    left = max(xs[nw], xs[w], xs[sw])
+    right = min(xs[ne], xs[e], xs[se])
+    bottom = max(ys[sw], ys[ss], ys[se])
+    top = min(ys[nw], ys[nn], ys[ne])
+    midX = (left + right) / 2
+    midY = (bottom + top) / 2
+    lo, hi = 0.0, 1.0
+    for _ in range(20):
+        t = (lo + hi) / 2
+        boxCorners = [(midX + t * (px - midX), midY + t * (py - midY))
+                      for px, py in ((left, bottom), (right, bottom), (right, top), (left, top))]
+        if all(insideConvex(xs, ys, corners, x, y) for x, y in boxCorners):
+            lo = t
+        else:
+            hi = t
+    if lo > 0 and left < right and bottom < top:
+        halfW = lo * (right - left) / 2
+        halfH = lo * (top - bottom) / 2
+        candidates = np.flatnonzero((np.abs(xs - midX) >= halfW) | (np.abs(ys - midY) >= halfH))
+    else:
+        candidates = np.arange(n)
+
+    return octagonOutside(xs, ys, corners, candidates)
+
+
+def octagonOutside(xs, ys, corners, candidates):
+    cx = xs[candidates]
+    cy = ys[candidates]
+    inside = np.ones(len(candidates), dtype=bool)
+    for k in range(len(corners)):
+        a = corners[k]
+        b = corners[(k + 1) % len(corners)]
+        inside &= orientSigns(xs[a], ys[a], xs[b], ys[b], cx, cy) > 0
+    return candidates[~inside]
+
+
+def insideConvex(xs, ys, corners, x, y):
+    for k in range(len(corners)):
+        a = corners[k]
+        b = corners[(k + 1) % len(corners)]
+        if orient(xs[a], ys[a], xs[b], ys[b], x, y) <= 0:
+            return False
+    return True
+
+
+HULL_ALGORITHMS = {
+    'divide_conquer': divideAndConquerHull,
+    'quickhull': quickHull,
+    'monotone_chain': monotoneChainHull,
+}
+
+
+# engines that start from an (x, y) sorted order; computeHull sorts for
+# them up front so the sort shows up on its own in the stats
+SORTED_ALGORITHMS = {'divide_conquer', 'monotone_chain'}
+
+
+def computeHull(points, algorithm='divide_conquer', prefilter=True, tracer=None, assumeSorted=False, stats=None):
+    # stats, when given a dict, receives filter_time, sort_time and
+    # hull_time in seconds (hull_time is the whole call)
+    if algorithm not in HULL_ALGORITHMS:
+        raise ValueError('Unknown hull algorithm {!r}, expected one of {}'.format(algorithm, sorted(HULL_ALGORITHMS)))
+    t1 = time.perf_counter()
+    pts = toPointArray(points)
+    keep = aklToussaintFilter(pts) if prefilter else None
+    if keep is not None:
+        # the survivors keep their input order, so sorted input stays sorted
+        pts = pts[keep]
+        if tracer is not None:
+            tracer = RemappedTracer(tracer, keep)
+    t2 = time.perf_counter()
+    order = sortByXY(pts, assumeSorted) if algorithm in SORTED_ALGORITHMS else None
+    t3 = time.perf_counter()
+
+    if algorithm == 'divide_conquer':
+        # only divide and conquer raises tracer events
+        hull = divideAndConquerHull(pts, tracer, order)
+    elif algorithm == 'monotone_chain':
+        hull = monotoneChainHull(pts, order)
+    else:
+        hull = HULL_ALGORITHMS[algorithm](pts)
+    hull = hull if keep is None else keep[hull]
+    if stats is not None:
+        stats['filter_time'] = t2 - t1
+        stats['sort_time'] = t3 - t2
+        stats['hull_time'] = time.perf_counter() - t1
+    return hull
@@ -0,0 +1,175 @@
+#!/usr/bin/python3
+
+# Queries answered from a finished hull: containment, the farthest pair and
+# the minimum-area enclosing rectangle.  They all work on the vertex order
+# every engine here returns (the mergeHulls order: leftmost point first,
+# then clockwise over the upper chain), so no extra sorting is needed.
+
+import math
+
+import numpy as np
+
+from hull_core import computeHull, orient, orientSigns, toPointArray
+
+
+class HullResult:
+    def __init__(self, points, hull):
+        # points: every input point; hull: indices of its hull in mergeHulls
+        # order, as computeHull returns them
+        self.points = toPointArray(points)
+        self.hull = np.asarray(hull, dtype=np.intp)
+        verts = self.points[self.hull]
+        # counter-clockwise copy starting at the same leftmost point; the
+        # fan search and the calipers below are written for that direction
+        self.ccw = np.concatenate((verts[:1], verts[:0:-1])) if len(verts) else verts
+        self.ccwX = self.ccw[:, 0].tolist()
+        self.ccwY = self.ccw[:, 1].tolist()
+
+    def __len__(self):
+        return len(self.hull)
+
+    def vertices(self):
+        return self.points[self.hull]
+
+    def ccwIndex(self, k):
+        # point index of the k-th counter-clockwise vertex
+        return self.hull[-k] if k else self.hull[0]
+
+    # -- containment --------------------------------------------------------
+
+    def contains(self, x, y):
+        # O(log h): binary search for the fan triangle from vertex 0 that
+        # could hold the point, then one edge test.  Boundary counts as in.
+        xs, ys = self.ccwX, self.ccwY
+        h = len(xs)
+        if h == 0:
+            return False
+        if h == 1:
+            return x == xs[0] and y == ys[0]
+        if h == 2:
+            return self.onSegment(0, 1, x, y)
+        x0, y0 = xs[0], ys[0]
+        if orient(x0, y0, xs[1], ys[1], x, y) < 0 or orient(x0, y0, xs[-1], ys[-1], x, y) > 0:
+            return False
+        lo, hi = 1, h - 1
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if orient(x0, y0, xs[mid], ys[mid], x, y) >= 0:
+                lo = mid
+            else:
+                hi = mid
+        return orient(xs[lo], ys[lo], xs[hi], ys[hi], x, y) >= 0
+
+    def onSegment(self, a, b, x, y):
+        xs, ys = self.ccwX, self.ccwY
+        return (orient(xs[a], ys[a], xs[b], ys[b], x, y) == 0
+                and min(xs[a], xs[b]) <= x <= max(xs[a], xs[b])
+                and min(ys[a], ys[b]) <= y <= max(ys[a], ys[b]))
+
+    def containsMany(self, queries):
+        # the same fan search, run for every query point at once
+        q = toPointArray(queries)
+        qx = q[:, 0]
+        qy = q[:, 1]
+        h = len(self.ccw)
+        if h < 3:
+            return np.array([self.contains(x, y) for x, y in q.tolist()], dtype=bool)
+        cx = self.ccw[:, 0]
+        cy = self.ccw[:, 1]
+        x0, y0 = cx[0], cy[0]
+        result = ((orientSigns(x0, y0, cx[1], cy[1], qx, qy) >= 0)
+                  & (orientSigns(x0, y0, cx[-1], cy[-1], qx, qy) <= 0))
+        lo = np.ones(len(q), dtype=np.intp)
+        hi = np.full(len(q), h - 1, dtype=np.intp)
+        while True:
+            active = hi - lo > 1
+            if not active.any():
+                break
+            mid = (lo + hi) // 2
+            left = orientSigns(x0, y0, cx[mid], cy[mid], qx, qy) >= 0
+            lo = np.where(active & left, mid, lo)
+            hi = np.where(active & ~left, mid, hi)
+        result &= orientSigns(cx[lo], cy[lo], cx[hi], cy[hi], qx, qy) >= 0
+        return result
+
+    # -- rotating calipers --------------------------------------------------
+
+    def diameter(self):
+        # farthest pair of input points, as (i, j, distance)
+        xs, ys = self.ccwX, self.ccwY
+        h = len(xs)
+        if h == 0:
+            raise ValueError('Empty hull has no diameter')
+        if h <= 2:
+            a, b = 0, h - 1
+            return (self.ccwIndex(a), self.ccwIndex(b), math.hypot(xs[b] - xs[a], ys[b] - ys[a]))
+
+        def twiceArea(a, b, c):
+            return abs((xs[b] - xs[a]) * (ys[c] - ys[a]) - (ys[b] - ys[a]) * (xs[c] - xs[a]))
+
+        best = (0.0, 0, 0)
+        j = 1
+        for i in range(h):
+            i2 = (i + 1) % h
+            # walk j to the vertex farthest from edge i
+            while twiceArea(i, i2, (j + 1) % h) > twiceArea(i, i2, j):
+                j = (j + 1) % h
+            for a in (i, i2):
+                d = (xs[j] - xs[a]) ** 2 + (ys[j] - ys[a]) ** 2
+                if d > best[0]:
+                    best = (d, a, j)
+        return (self.ccwIndex(best[1]), self.ccwIndex(best[2]), math.sqrt(best[0]))
+
+    def minAreaRectangle(self):
+        # smallest enclosing rectangle: one side always lies along a hull
+        # edge, so sweep the edges with three calipers (far along the edge,
+        # back along it, and farthest from it).  Returns (area, corners)
+        # with the corners counter-clockwise.
+        xs, ys = self.ccwX, self.ccwY
+        h = len(xs)
+        if h == 0:
+            raise ValueError('Empty hull has no bounding rectangle')
+        if h <= 2:
+            a, b = 0, h - 1
+            corners = np.array([[xs[a], ys[a]], [xs[b], ys[b]], [xs[b], ys[b]], [xs[a], ys[a]]])
+            return (0.0, corners)
+
+        def proj(k, ux, uy, ox, oy):
+            return (xs[k] - ox) * ux + (ys[k] - oy) * uy
+
+        best = None
+        right = top = left = None
+        for i in range(h):
+            i2 = (i + 1) % h
+            ex, ey = xs[i2] - xs[i], ys[i2] - ys[i]
+            length = math.hypot(ex, ey)
+            ux, uy = ex / length, ey / length
+            nx, ny = -uy, ux       # inward normal for a counter-clockwise hull
+            ox, oy = xs[i], ys[i]
+            if right is None:
+                right = max(range(h), key=lambda k: proj(k, ux, uy, ox, oy))
+                top = max(range(h), key=lambda k: proj(k, nx, ny, ox, oy))
+                left = min(range(h), key=lambda k: proj(k, ux, uy, ox, oy))
+            else:
+                while proj((right + 1) % h, ux, uy, ox, oy) > proj(right, ux, uy, ox, oy):
+                    right = (right + 1) % h
+                while proj((top + 1) % h, nx, ny, ox, oy) > proj(top, nx, ny, ox, oy):
+                    top = (top + 1) % h
+                while proj((left + 1) % h, ux, uy, ox, oy) < proj(left, ux, uy, ox, oy):
+                    left = (left + 1) % h
+            maxU = proj(right, ux, uy, ox, oy)
+            minU = proj(left, ux, uy, ox, oy)
+            maxN = proj(top, nx, ny, ox, oy)
+            area = (maxU - minU) * maxN
+            if best is None or area < best[0]:
+                best = (area, ox, oy, ux, uy, nx, ny, minU, maxU, maxN)
+
+        area, ox, oy, ux, uy, nx, ny, minU, maxU, maxN = best
+        corners = np.array([[ox + ux * u + nx * n, oy + uy * u + ny * n]
+                            for u, n in ((minU, 0.0), (maxU, 0.0), (maxU, maxN), (minU, maxN))])
+        return (area, corners)
+
+
+def computeHullResult(points, algorithm='divide_conquer', prefilter=True):
+    pts = toPointArray(points)
+    return HullResult(pts, computeHull(pts, algorithm, prefilter))
@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+
+# Hull that grows as points arrive, for callers that need the current hull
+# after every batch without recomputing from scratch.  The hull is held as
+# its two monotone halves, the upper chain and the lower chain, each a list
+# of vertex ids sorted on (x, y); together they are the same clockwise cycle
+# mergeHulls builds.  A new point finds its place in each chain by binary
+# search, O(log h) orientation tests, and only ever removes the vertices it
+# makes redundant (O(1) amortized, as each vertex leaves once).  Putting it
+# into the chain is a list insert, though, an O(h) shift of ids; it is a
+# memmove and cheap next to the geometry, but an insert that changes the
+# hull is O(log h + h), not O(log h).  Points inside the small inner
+# polygon are rejected in O(1), and other interior points cost the search
+# alone, never a list update.
+#
+# HullCore's nxt/prv link arrays would make the splice O(1), but a linked
+# cycle has no random access, so finding where a point lands means walking
+# it in O(h) orientation tests; sorted chains keep the search logarithmic
+# and hull() still hands back the clockwise cycle ConvexHullSolver expects.
+
+from bisect import bisect_left
+
+import numpy as np
+
+from hull_core import monotoneChainHull, orient, orientSigns, toPointArray
+
+
+# batches this small skip the vectorized pre-passes
+SMALL_BATCH = 8
+
+
+class OnlineHull:
+    def __init__(self, points=None):
+        self.count = 0          # ids handed out so far, one per inserted point
+        self.coords = {}        # id -> (x, y), hull vertices only
+        self.upper = []         # ids, left to right, turning clockwise
+        self.lower = []         # ids, left to right, turning counter-clockwise
+        self.upperKeys = []     # (x, y) of self.upper, for bisect
+        self.lowerKeys = []
+        self.inner = []         # small polygon inside the hull for the O(1) test
+        self.removed = []       # ids dropped from a chain during one insert
+        self.snapshot = None
+        if points is not None:
+            self.insert(points)
+
+    def __len__(self):
+        return len(self.upper) + max(0, len(self.lower) - 2)
+
+    def insert(self, points):
+        pts = toPointArray(points)
+        if len(pts) == 0:
+            # an empty batch: no ids handed out, and the snapshot stays
+            return
+        first = self.count
+        self.count += len(pts)
+
+        if len(pts) <= SMALL_BATCH:
+            # numpy overhead dominates for a handful of points, test them one
+            # at a time against the inner polygon instead
+            candidates = [k for k, (x, y) in enumerate(pts.tolist()) if not self.insideInnerPoint(x, y)]
+        else:
+            # only the batch's own hull vertices can end up on the combined
+            # hull, and of those only the ones outside the inner polygon need
+            # a search
+            candidates = monotoneChainHull(pts)
+            if self.inner:
+                candidates = candidates[~self.insideInner(pts[candidates])]
+            candidates = candidates.tolist()
+
+        changed = False
+        for k in candidates:
+            changed |= self.insertPoint(first + k, pts[k, 0].item(), pts[k, 1].item())
+        if changed:
+            self.snapshot = None
+            self.refreshInner()
+
+    def insertPoint(self, pid, x, y):
+        key = (x, y)
+        if not self.upper:
+            self.coords[pid] = key
+            self.upper = [pid]
+            self.lower = [pid]
+            self.upperKeys = [key]
+            self.lowerKeys = [key]
+            return True
+        addedUpper = self.insertChain(self.upper, self.upperKeys, pid, key, -1)
+        addedLower = self.insertChain(self.lower, self.lowerKeys, pid, key, 1)
+        if addedUpper or addedLower:
+            self.coords[pid] = key
+        # an old end point can leave one chain and stay on the other
+        for vid in set(self.removed):
+            vkey = self.coords[vid]
+            if not (self.onChain(self.upperKeys, vkey) or self.onChain(self.lowerKeys, vkey)):
+                del self.coords[vid]
+        self.removed = []
+        return addedUpper or addedLower
+
+    def onChain(self, keys, key):
+        k = bisect_left(keys, key)
+        return k < len(keys) and keys[k] == key
+
+    def turn(self, chainKeys, a, b, c):
+        return orient(chainKeys[a][0], chainKeys[a][1], chainKeys[b][0], chainKeys[b][1],
+                      chainKeys[c][0], chainKeys[c][1])
+
+    def insertChain(self, chain, keys, pid, key, sign):
+        # sign is the turn every interior vertex of this chain makes:
+        # -1 (clockwise) for the upper chain, 1 for the lower
+        k = bisect_left(keys, key)
+        if k < len(keys) and keys[k] == key:
+            return False
+        if 0 < k < len(keys):
+            a, b = keys[k - 1], keys[k]
+            # on or inside the chain between its neighbours: nothing to do
+            if orient(a[0], a[1], key[0], key[1], b[0], b[1]) != sign:
+                return False
+
+        chain.insert(k, pid)
+        keys.insert(k, key)
+        # drop the vertices the new point makes redundant on either side
+        while k + 2 < len(keys) and self.turn(keys, k, k + 1, k + 2) != sign:
+            self.discard(chain, keys, k + 1)
+        while k >= 2 and self.turn(keys, k - 2, k - 1, k) != sign:
+            self.discard(chain, keys, k - 1)
+            k -= 1
+        return True
+
+    def discard(self, chain, keys, k):
+        self.removed.append(chain.pop(k))
+        keys.pop(k)
+
+    def refreshInner(self):
+        # both ends plus the middle vertex of each chain, clockwise
+        upper = self.upperKeys
+        lower = self.lowerKeys
+        inner = [upper[0]]
+        if len(upper) > 2:
+            inner.append(upper[len(upper) // 2])
+        inner.append(upper[-1])
+        if len(lower) > 2:
+            inner.append(lower[len(lower) // 2])
+        self.inner = inner if len(inner) >= 3 else []
+
+    def insideInner(self, pts):
+        inside = np.ones(len(pts), dtype=bool)
+        inner = self.inner
+        for k in range(len(inner)):
+            a = inner[k]
+            b = inner[(k + 1) % len(inner)]
+            # clockwise polygon, so inside is strictly to the right of every edge
+            inside &= orientSigns(a[0], a[1], b[0], b[1], pts[:, 0], pts[:, 1]) < 0
+        return inside
+
+    def insideInnerPoint(self, x, y):
+        inner = self.inner
+        if not inner:
+            return False
+        for k in range(len(inner)):
+            a = inner[k]
+            b = inner[(k + 1) % len(inner)]
+            if orient(a[0], a[1], b[0], b[1], x, y) >= 0:
+                return False
+        return True
+
+    def hull(self):
+        # vertex ids in mergeHulls order: leftmost, upper chain, lower back
+        if self.snapshot is None:
+            ids = self.upper + self.lower[-2:0:-1]
+            self.snapshot = np.asarray(ids, dtype=np.intp)
+            self.snapshot.setflags(write=False)
+        return self.snapshot
+
+    def hullPoints(self):
+        return np.asarray([self.coords[i] for i in self.hull().tolist()], dtype=np.float64).reshape(-1, 2)
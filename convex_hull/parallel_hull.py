@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+
+# Divide and conquer across a process pool.  The top few levels of the
+# recursion are cut into 2**levels contiguous slices of the (x, y) sorted
+# points; each slice's hull is computed in a worker and the parent merges
+# the sub-hulls back up with HullCore.mergeHulls.  The sorted coordinates go
+# to the workers through one shared memory block instead of being pickled.
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from hull_core import HULL_ALGORITHMS, HullCore, aklToussaintFilter, sortByXY, toPointArray, uniqueSorted
+
+
+# below this many points per slice the pool costs more than it saves
+MIN_SLICE_POINTS = 50000
+
+
+def sliceHull(shmName, n, start, stop, algorithm):
+    shm = shared_memory.SharedMemory(name=shmName)
+    try:
+        coords = np.ndarray((n, 2), dtype=np.float64, buffer=shm.buf)
+        hull = HULL_ALGORITHMS[algorithm](coords[start:stop])
+        return hull + start
+    finally:
+        del coords
+        shm.close()
+
+
+def mergeAll(coords, hulls):
+    # Only hull vertices reach the parent, so give HullCore compact lists of
+    # just those coordinates and merge neighbouring slices pairwise, the same
+    # shape the serial recursion would have had above the cut.
+    vertices = np.concatenate(hulls)
+    core = HullCore(coords[vertices, 0].tolist(), coords[vertices, 1].tolist())
+    level = []
+    offset = 0
+    for hull in hulls:
+        level.append(core.linkHull(list(range(offset, offset + len(hull)))))
+        offset += len(hull)
+    while len(level) > 1:
+        merged = [core.mergeHulls(level[k], level[k + 1]) for k in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            merged.append(level[-1])
+        level = merged
+    return vertices[core.hullVertices(level[0])]
+
+
+def parallelHull(points, workers=None, levels=None, algorithm='divide_conquer', prefilter=True, executor=None):
+    if algorithm not in HULL_ALGORITHMS:
+        raise ValueError('Unknown hull algorithm {!r}, expected one of {}'.format(algorithm, sorted(HULL_ALGORITHMS)))
+    pts = toPointArray(points)
+    keep = aklToussaintFilter(pts) if prefilter else np.arange(len(pts))
+    order = keep[uniqueSorted(pts[keep], sortByXY(pts[keep]))]
+    n = len(order)
+
+    workers = workers or os.cpu_count() or 1
+    if levels is None:
+        levels = max(0, math.ceil(math.log2(workers)))
+    slices = 2 ** levels
+    while slices > 1 and n < slices * MIN_SLICE_POINTS:
+        slices //= 2
+    if slices == 1:
+        return order[HULL_ALGORITHMS[algorithm](pts[order])]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, n * 2 * 8))
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        coords = np.ndarray((n, 2), dtype=np.float64, buffer=shm.buf)
+        coords[:] = pts[order]
+        bounds = np.linspace(0, n, slices + 1).astype(np.intp)
+        futures = [pool.submit(sliceHull, shm.name, n, bounds[k], bounds[k + 1], algorithm)
+                   for k in range(slices)]
+        hulls = [f.result() for f in futures]
+        hull = mergeAll(coords, hulls)
+        del coords
+    finally:
+        if executor is None:
+            pool.shutdown()
+        shm.close()
+        shm.unlink()
+    return order[hull]
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+
+# Seeded point clouds for the GUI and the benchmarks, drawn straight into
+# numpy arrays.  The distributions are the ones Proj2GUI has always offered:
+# uniform in a disc (oval), the first two coordinates of a point uniform in
+# a ball (sphere), and a gaussian cut at the same radius.  Every x value is
+# unique, as the divide and conquer solver was written to expect.
+
+import numpy as np
+
+
+DISTRIBUTIONS = ['oval', 'sphere', 'gaussian']
+DISTRIBUTIONS_3D = ['sphere', 'gaussian']
+
+MAX_R = 0.98
+
+# share of raw draws each distribution keeps, for sizing the batches
+ACCEPT_RATE = {
+    'oval': np.pi * MAX_R ** 2 / 4,
+    'sphere': 4 / 3 * np.pi * MAX_R ** 3 / 8,
+    'gaussian': 1.0,
+}
+
+
+def drawBatch(rng, distribution, count, dimensions):
+    if distribution == 'oval':
+        pts = rng.uniform(-1.0, 1.0, (count, 2))
+        r2 = (pts ** 2).sum(axis=1)
+    elif distribution == 'sphere':
+        pts = rng.uniform(-1.0, 1.0, (count, 3))
+        r2 = (pts ** 2).sum(axis=1)
+        pts = pts[:, :dimensions]
+    else:
+        pts = rng.normal(0.0, 0.25, (count, dimensions))
+        r2 = (pts ** 2).sum(axis=1)
+    return pts[r2 <= MAX_R ** 2]
+
+
+def generatePoints(distribution, npoints, seed=None, dimensions=2):
+    # (npoints, dimensions) float64 array; seed None draws fresh entropy
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError('Unknown distribution {!r}, expected one of {}'.format(distribution, DISTRIBUTIONS))
+    if dimensions == 3 and distribution not in DISTRIBUTIONS_3D:
+        raise ValueError('3D points come from one of {}, not {!r}'.format(DISTRIBUTIONS_3D, distribution))
+    if dimensions not in (2, 3):
+        raise ValueError('dimensions must be 2 or 3, got {}'.format(dimensions))
+    rng = np.random.default_rng(seed)
+    pts = np.empty((0, dimensions))
+    while len(pts) < npoints:
+        missing = npoints - len(pts)
+        batch = drawBatch(rng, distribution, int(missing / ACCEPT_RATE[distribution] * 1.05) + 16, dimensions)
+        pts = np.concatenate((pts, batch))
+        # keep the first draw of every x value, in draw order
+        _, first = np.unique(pts[:, 0], return_index=True)
+        if len(first) < len(pts):
+            pts = pts[np.sort(first)]
+    return pts[:npoints]
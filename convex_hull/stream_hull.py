@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+
+# Out-of-core hulls for point files too big to load.  The file is memory
+# mapped and read in fixed-size chunks; each chunk's hull is computed on its
+# own and folded into a running hull, so peak memory stays around one chunk
+# plus the hull, whatever the size of the file.
+
+import os
+
+import numpy as np
+
+from hull_core import HullCore, computeHull, isLexBefore, monotoneChainHull
+
+
+DEFAULT_CHUNK_POINTS = 1 << 20
+
+
+def openPointFile(path, dtype=np.float64):
+    # .npy files carry their own header; anything else is taken as raw
+    # interleaved x, y values of the given dtype
+    if str(path).endswith('.npy'):
+        points = np.load(path, mmap_mode='r')
+    else:
+        points = np.memmap(path, dtype=dtype, mode='r')
+        points = points.reshape(-1, 2)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError('Expected an (N, 2) point file, got shape {}'.format(points.shape))
+    return points
+
+
+def mergeRunning(runIds, runPts, ids, pts):
+    # When the new hull lies wholly to the right of the running one (files
+    # written in x order) the two are joined with the divide and conquer
+    # merge; otherwise the hull of the union of both vertex sets is taken.
+    if len(runIds) == 0:
+        return ids, pts
+    if len(pts) == 0:
+        return runIds, runPts
+    both = np.concatenate((runPts, pts))
+    xs = both[:, 0].tolist()
+    ys = both[:, 1].tolist()
+    runLast = max(range(len(runPts)), key=lambda k: (xs[k], ys[k]))
+    if isLexBefore(xs, ys, runLast, len(runPts)):
+        core = HullCore(xs, ys)
+        left = core.linkHull(list(range(len(runPts))))
+        right = core.linkHull(list(range(len(runPts), len(both))))
+        merged = np.asarray(core.hullVertices(core.mergeHulls(left, right)), dtype=np.intp)
+    else:
+        merged = monotoneChainHull(both)
+    return np.concatenate((runIds, ids))[merged], both[merged]
+
+
+def streamHull(source, chunkPoints=DEFAULT_CHUNK_POINTS, algorithm='monotone_chain', prefilter=True, dtype=np.float64):
+    # source is a path to a .npy or raw binary file, or any (N, 2) array-like
+    # that slices lazily (np.memmap, h5py datasets, ...).  Returns the hull as
+    # row numbers into the source and their coordinates.
+    points = openPointFile(source, dtype) if isinstance(source, (str, os.PathLike)) else source
+    runIds = np.empty(0, dtype=np.intp)
+    runPts = np.empty((0, 2), dtype=np.float64)
+    for start in range(0, len(points), chunkPoints):
+        chunk = np.asarray(points[start:start + chunkPoints], dtype=np.float64)
+        hull = computeHull(chunk, algorithm, prefilter)
+        runIds, runPts = mergeRunning(runIds, runPts, hull + start, chunk[hull])
+        del chunk
+    return runIds, runPts
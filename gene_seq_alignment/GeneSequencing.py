@@ -13,142 +13,254 @@ else:
 
 import time
 
+from alignment_core import (BAND_DISTANCE, FULL_MATRIX_CELLS, INDEL, MATCH, STEP_ABOVE, STEP_DIAGONAL, STEP_RIGHT,
+                            SUBSTITUTION, alignCost, alignLinearSpace, alignMatrix, bandedAlignMatrix, costLowerBound,
+                            editDistance)
+from kmer_index import MAX_OCCURRENCES, chainSeeds
+from result_cache import sequenceHash
 
 
 class GeneSequencing:
     def __init__( self ):
-        pass
+        # cells further than this from the diagonal are skipped when banded
+        self.band = BAND_DISTANCE
+        # larger unbanded alignments switch to the checkpointed walk, which
+        # gives the same strings without the full path matrix
+        self.max_matrix_cells = FULL_MATRIX_CELLS
+        # pairs whose edit-distance bound on the cost is above this are
+        # reported as infinite without a DP; None screens nothing
+        self.screen_threshold = None
+        # a kmer_index.KmerIndex over the sequences switches align_pair to
+        # seed-and-extend: banded DP only between the chained seeds
+        self.kmer_index = None
+        # a result_cache.ResultCache to read finished pairs from and store
+        # new ones in
+        self.result_cache = None
 
-    def align_all( self, sequences, banded, align_length ):
+    def align_all( self, sequences, banded, align_length, cost_only=False ):
+        # cost_only leaves the alignment strings out of every computed pair;
+        # align_pair fills in one pair on demand
         results = []
         for i in range(len(sequences)):
             jresults = []
-            sequ_i = sequences[i]
-            # print(sequ_i)
-            sequ_i_len = len(sequ_i)
             for j in range(0, len(sequences)):
-                sequ_j = sequences[j]
-                # print(sequ_j)
-                sequ_j_len = len(sequ_j)
-                if(i == j):
-                    s = {'align_cost': max(-3*align_length,-3*align_length),
-                         'seqi_first100': 'abc-easy  DEBUG:(seq{}, {} chars,align_len={}{})'.format(i + 1,
-                                                                                                    len(sequences[i]),
-                                                                                                    align_length,
-                                                                                                    ',BANDED' if banded else ''),
-                         'seqj_first100': 'as-123--  DEBUG:(seq{}, {} chars,align_len={}{})'.format(j + 1,
-                                                                                                    len(sequences[j]),
-                                                                                                    align_length,
-                                                                                                    ',BANDED' if banded else '')}
-                elif((i == 0 and j != 1) or (i == 1 and j != 0)):
-                    s = {'align_cost': float('inf'),
-                         'seqi_first100': 'abc-easy  DEBUG:(seq{}, {} chars,align_len={}{})'.format(i + 1,
-                                                                                                    len(sequences[i]),
-                                                                                                    align_length,
-                                                                                                    ',BANDED' if banded else ''),
-                         'seqj_first100': 'as-123--  DEBUG:(seq{}, {} chars,align_len={}{})'.format(j + 1,
-                                                                                                    len(sequences[j]),
-                                                                                                    align_length,
-                                                                                                    ',BANDED' if banded else '')}
-                elif(i > j):
-                    s = {'align_cost': 0,
-                         'seqi_first100': 'abc-easy  DEBUG:(seq{}, {} chars,align_len={}{})'.format(i + 1,
-                                                                                                    len(sequences[i]),
-                                                                                                    align_length,
-                                                                                                    ',BANDED' if banded else ''),
-                         'seqj_first100': 'as-123--  DEBUG:(seq{}, {} chars,align_len={}{})'.format(j + 1,
-                                                                                                    len(sequences[j]),
-                                                                                                    align_length,
-                                                                                                    ',BANDED' if banded else '')}
-                else:
-                    # Here is the algorithm Code
-
-                    if(align_length > sequ_i_len):
-                        if(align_length > sequ_j_len):
-                            dist_matrix = [[0 for col in range(sequ_i_len + 1)] for row in range(sequ_j_len + 1)]
-                            path_matrix = [[("") for col in range(sequ_i_len + 1)] for row in range(sequ_j_len + 1)]
-                    else:
-                        dist_matrix = [[0 for col in range(align_length + 1)] for row in range(align_length + 1)]
-                        path_matrix = [[("") for col in range(align_length + 1)] for row in range(align_length + 1)]
-
-                    for m in range(len(dist_matrix[0])):
-                        dist_matrix[0][m] = m * 5
-                        path_matrix[0][m] = 'r'
-
-                    for m in range(len(dist_matrix)):
-                        dist_matrix[m][0] = m * 5
-                        path_matrix[m][0] = 'a'
-
-                    path_matrix[0][0]= ""
-
-                    for k in range(1, len(dist_matrix)):
-                        for l in range(1, len(dist_matrix[0])):
-                            right_of = dist_matrix[k - 1][l] + 5
-                            above = dist_matrix[k][l - 1] + 5
-                            diagonal = dist_matrix[k - 1][l - 1] + self.diff(sequ_i, sequ_j, k-1, l-1)
-                            mininum = min(right_of, above, diagonal)
-                            dist_matrix[k][l] = mininum
-                            if(mininum == right_of):
-                               path_matrix[k][l] = ("r")
-                            elif(mininum == above):
-                                path_matrix[k][l] = ( "a")
-                            elif(mininum == diagonal):
-                                path_matrix[k][l] = ("d")
-                    alignment = self.extract_align(path_matrix, sequ_i, sequ_j)
-                    s = {'align_cost': dist_matrix[-1][-1],
-                         'seqi_first100': alignment[0] + ' | DEBUG:(seq{}, {} chars,align_len={}{})'.format(i + 1,
-                                                                                                    len(sequences[i]),
-                                                                                                    align_length,
-                                                                                                    ',BANDED' if banded else ''),
-                         'seqj_first100': alignment[1] + ' | DEBUG:(seq{}, {} chars,align_len={}{})'.format(j + 1,
-                                                                                                    len(sequences[j]),
-                                                                                                    align_length,
-                                                                                                    ',BANDED' if banded else '')}
-                jresults.append(s)
-
+                jresults.append(self.align_pair(sequences, i, j, banded, align_length, cost_only))
             results.append(jresults)
         # print(results)
         return results
 
+    def align_pair( self, sequences, i, j, banded, align_length, cost_only=False ):
+        sequ_i = sequences[i]
+        sequ_j = sequences[j]
+        if(i == j):
+            s = {'align_cost': max(-3*align_length,-3*align_length),
+                 'seqi_first100': 'abc-easy  DEBUG:(seq{}, {} chars,align_len={}{})'.format(i + 1,
+                                                                                            len(sequences[i]),
+                                                                                            align_length,
+                                                                                            ',BANDED' if banded else ''),
+                 'seqj_first100': 'as-123--  DEBUG:(seq{}, {} chars,align_len={}{})'.format(j + 1,
+                                                                                            len(sequences[j]),
+                                                                                            align_length,
+                                                                                            ',BANDED' if banded else '')}
+        elif((i == 0 and j != 1) or (i == 1 and j != 0)):
+            s = {'align_cost': float('inf'),
+                 'seqi_first100': 'abc-easy  DEBUG:(seq{}, {} chars,align_len={}{})'.format(i + 1,
+                                                                                            len(sequences[i]),
+                                                                                            align_length,
+                                                                                            ',BANDED' if banded else ''),
+                 'seqj_first100': 'as-123--  DEBUG:(seq{}, {} chars,align_len={}{})'.format(j + 1,
+                                                                                            len(sequences[j]),
+                                                                                            align_length,
+                                                                                            ',BANDED' if banded else '')}
+        elif(i > j):
+            s = {'align_cost': 0,
+                 'seqi_first100': 'abc-easy  DEBUG:(seq{}, {} chars,align_len={}{})'.format(i + 1,
+                                                                                            len(sequences[i]),
+                                                                                            align_length,
+                                                                                            ',BANDED' if banded else ''),
+                 'seqj_first100': 'as-123--  DEBUG:(seq{}, {} chars,align_len={}{})'.format(j + 1,
+                                                                                            len(sequences[j]),
+                                                                                            align_length,
+                                                                                            ',BANDED' if banded else '')}
+        else:
+            # Here is the algorithm Code
+
+            # both sequences are cut to align_length; results already in
+            # the cache (if there is one) are read back instead of aligned
+            sequ_i = sequ_i[:align_length]
+            sequ_j = sequ_j[:align_length]
+            key = hit = None
+            if self.result_cache is not None:
+                key = self.result_cache.key(sequ_i, sequ_j, align_length, banded, self.settings_key(sequences, i, j))
+                hit = self.result_cache.get(key, needStrings=not cost_only)
+            if hit is not None:
+                cost, alignment = hit
+            else:
+                cost, alignment = self.compute_pair(i, j, sequ_i, sequ_j, banded, cost_only)
+                if key is not None:
+                    self.result_cache.put(key, cost, alignment)
+            if cost_only:
+                # the strings come from align_pair when someone asks
+                return {'align_cost': cost}
+            s = {'align_cost': cost,
+                 'seqi_first100': alignment[0] + ' | DEBUG:(seq{}, {} chars,align_len={}{})'.format(i + 1,
+                                                                                            len(sequences[i]),
+                                                                                            align_length,
+                                                                                            ',BANDED' if banded else ''),
+                 'seqj_first100': alignment[1] + ' | DEBUG:(seq{}, {} chars,align_len={}{})'.format(j + 1,
+                                                                                            len(sequences[j]),
+                                                                                            align_length,
+                                                                                            ',BANDED' if banded else '')}
+        return s
 
-    def diff(self, sequ_i, sequ_j, k, l):
-        # print(k, l)
-        # print(sequ_i[l], sequ_j[k])
-        if(sequ_i[l] == sequ_j[k]):
-            return -3
+    def compute_pair(self, i, j, sequ_i, sequ_j, banded, cost_only=False):
+        # (cost, (alignment_i, alignment_j)) for two already truncated
+        # sequences, with no alignment when cost_only.  The DP in
+        # alignment_core fills the whole matrix row by row, or only the
+        # cells near the diagonal when banded.
+        if self.screened(sequ_i, sequ_j):
+            # can't come in under the threshold; reported like a pair
+            # outside the band
+            cost, alignment = float('inf'), ('No Alignment Possible', 'No Alignment Possible')
+        elif self.kmer_index is not None and not (banded and abs(len(sequ_i) - len(sequ_j)) > self.band):
+            # a banded pair whose lengths leave the band goes on to the
+            # banded DP, which reports it as infinite
+            cost, alignment = self.align_seeded(i, j, sequ_i, sequ_j, banded, cost_only)
+        elif cost_only:
+            # two rolling rows and no path at all
+            if banded:
+                cost, _ = bandedAlignMatrix(sequ_i, sequ_j, self.band, keepPath=False)
+            else:
+                cost = alignCost(sequ_i, sequ_j)
+            alignment = None
+        elif banded:
+            cost, path_band = bandedAlignMatrix(sequ_i, sequ_j, self.band)
+            if path_band is None:
+                alignment = ('No Alignment Possible', 'No Alignment Possible')
+            else:
+                alignment = self.extract_banded_align(path_band, self.band, sequ_i, sequ_j)
+        elif (len(sequ_i) + 1) * (len(sequ_j) + 1) > self.max_matrix_cells:
+            cost, alignment = alignLinearSpace(sequ_i, sequ_j)
         else:
-            return 1
+            cost, path_matrix = alignMatrix(sequ_i, sequ_j)
+            alignment = self.extract_align(path_matrix, sequ_i, sequ_j)
+        return cost, alignment
+
+    def settings_key(self, sequences, i, j):
+        # everything besides the truncated sequences, align_length and
+        # banded that changes what compute_pair returns.  Seeds are chosen
+        # from k-mer counts over the whole sequences, so a seeded result
+        # also depends on everything past align_length.
+        key = 'indel={},match={},sub={},band={},screen={}'.format(INDEL, MATCH, SUBSTITUTION, self.band,
+                                                                 self.screen_threshold)
+        if self.kmer_index is not None:
+            key += ',seed={},repeats={},full={},{}'.format(self.kmer_index.k, MAX_OCCURRENCES,
+                                                          sequenceHash(sequences[i]), sequenceHash(sequences[j]))
+        return key
+
+    def align_seeded(self, i, j, sequ_i, sequ_j, banded=False, cost_only=False):
+        # Seed-and-extend: the chained seeds are taken as matches, and the
+        # stretches between them go through bandedAlignMatrix, with the band
+        # widened to whatever net shift the stretch needs.  The result is
+        # the best alignment through the anchors, so its cost is never below
+        # the full DP's.  When banded, only seeds within self.band of the
+        # main diagonal are used, and each stretch keeps to that same band
+        # (centred on the main diagonal, not the stretch's own), so the
+        # result is never below the banded DP's either.  Packed sequences
+        # are unpacked once, up front, as the stretches slice them many
+        # times.
+        sequ_i = str(sequ_i)
+        sequ_j = str(sequ_j)
+        seeds_i, seeds_j = self.kmer_index.seeds(i, j, len(sequ_i), len(sequ_j))
+        if banded:
+            near = abs(seeds_i - seeds_j) <= self.band
+            seeds_i = seeds_i[near]
+            seeds_j = seeds_j[near]
+        anchors = chainSeeds(seeds_i, seeds_j, self.kmer_index.k, sequ_i, sequ_j)
+        cost = 0
+        parts_i = []
+        parts_j = []
+        end_i = end_j = 0
+        for start_i, start_j, length in anchors + [(len(sequ_i), len(sequ_j), 0)]:
+            gap_i = sequ_i[end_i:start_i]
+            gap_j = sequ_j[end_j:start_j]
+            if banded:
+                band, center = self.band, end_j - end_i
+            else:
+                band, center = max(self.band, abs(len(gap_i) - len(gap_j))), 0
+            gap_cost, path_band = bandedAlignMatrix(gap_i, gap_j, band, keepPath=not cost_only, center=center)
+            cost += gap_cost + MATCH * length
+            if not cost_only:
+                gap_i, gap_j = self.extract_banded_align(path_band, band, gap_i, gap_j, center)
+                parts_i += [gap_i, sequ_i[start_i:start_i + length]]
+                parts_j += [gap_j, sequ_j[start_j:start_j + length]]
+            end_i = start_i + length
+            end_j = start_j + length
+        return cost, (None if cost_only else (''.join(parts_i), ''.join(parts_j)))
+
+    def screened(self, sequ_i, sequ_j):
+        if self.screen_threshold is None:
+            return False
+        bound = costLowerBound(len(sequ_i), len(sequ_j), editDistance(sequ_i, sequ_j))
+        return bound > self.screen_threshold
 
     def extract_align(self, path_matrix, sequ_i, sequ_j):
-        return_i = ""
-        return_j = ""
-        path = ""
-        j = -1
-        k = -1
-        while(path_matrix[j][k] != ''):
-            path += path_matrix[j][k]
-            if(path_matrix[j][k] == 'd'):
+        # Walks the uint8 direction codes back from the last cell: d steps
+        # back on both, a on the row (a gap in sequ_i), r on the column (a
+        # gap in sequ_j), until the start cell.  Characters are collected
+        # back to front and joined once at the end.
+        return_i = []
+        return_j = []
+        j = path_matrix.shape[0] - 1
+        k = path_matrix.shape[1] - 1
+        while True:
+            step = path_matrix[j, k]
+            if step == STEP_DIAGONAL:
+                return_i.append(sequ_i[k - 1])
+                return_j.append(sequ_j[j - 1])
                 j = j - 1
                 k = k - 1
-            elif(path_matrix[j][k] == 'a'):
+            elif step == STEP_ABOVE:
+                return_i.append('-')
+                return_j.append(sequ_j[j - 1])
                 j = j - 1
-            elif(path_matrix[j][k] == 'r'):
+            elif step == STEP_RIGHT:
+                return_i.append(sequ_i[k - 1])
+                return_j.append('-')
                 k = k - 1
-
-        path = path[::-1]
-        i_spot = 0
-        j_spot = 0
-        for i in range(len(path)):
-            if (path[i] == 'a'):
-                return_i += "-"
             else:
-                return_i += sequ_i[i_spot]
-                i_spot += 1
+                break
 
-            if (path[i] == 'r'):
-                return_j += "-"
-            else:
-                return_j += sequ_j[j_spot]
-                j_spot += 1
+        return (''.join(reversed(return_i)), ''.join(reversed(return_j)))
 
-        return (return_i, return_j)
+    def extract_banded_align(self, path_band, band, sequ_i, sequ_j, center=0):
+        # Walks the compact band from the end cell back to the start.  Each
+        # step follows the move the DP actually took: right_of came from the
+        # row above, above from the column to the left (the first row and
+        # column can only lead back to the start).  Row k, column l lives in
+        # slot l - k + band - center.
+        k = len(sequ_j)
+        l = len(sequ_i)
+        return_i = []
+        return_j = []
+        while k > 0 or l > 0:
+            if k == 0:
+                step = STEP_ABOVE
+            elif l == 0:
+                step = STEP_RIGHT
+            else:
+                step = path_band[k][l - k + band - center]
+            if step == STEP_DIAGONAL:
+                return_i.append(sequ_i[l - 1])
+                return_j.append(sequ_j[k - 1])
+                k -= 1
+                l -= 1
+            elif step == STEP_RIGHT:
+                return_i.append('-')
+                return_j.append(sequ_j[k - 1])
+                k -= 1
+            elif step == STEP_ABOVE:
+                return_i.append(sequ_i[l - 1])
+                return_j.append('-')
+                l -= 1
+        return (''.join(reversed(return_i)), ''.join(reversed(return_j)))
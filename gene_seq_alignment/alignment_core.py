@@ -0,0 +1,260 @@
+#!/usr/bin/python3
+
+# Headless alignment core.  Nothing in here imports Qt.  The scoring and the
+# tie-breaks are the ones GeneSequencing.align_all has always used: an indel
+# costs +5, a match -3 and a substitution +1, and when several moves give
+# the minimum the first of right_of, above, diagonal wins.
+#
+# The matrix has a row per character of sequence j (plus the empty prefix)
+# and a column per character of sequence i.  right_of comes from the row
+# above, above from the column to the left, as align_all has always named
+# them.
+
+import numpy as np
+
+
+INDEL = 5
+MATCH = -3
+SUBSTITUTION = 1
+
+# path_matrix direction codes, one uint8 per cell; the letters are the
+# ones the string path_matrix used to hold
+STEP_NONE = 0           # ''  the start cell
+STEP_RIGHT = 1          # 'r'
+STEP_ABOVE = 2          # 'a'
+STEP_DIAGONAL = 3       # 'd'
+
+
+# past this many cells align_all stops building the full path matrix
+FULL_MATRIX_CELLS = 1 << 24
+
+
+def encodeSequence(seq):
+    # one integer code per character, for vectorized comparisons; packed
+    # sequences (sequence_store.PackedSequence) unpack their own
+    if isinstance(seq, str):
+        return np.frombuffer(seq.encode('utf-32-le'), dtype=np.uint32)
+    return seq.codes()
+
+
+def nextRow(prev, k, codes_i, code_j, steps, pathRow=None):
+    # Row k of the DP from row k - 1.  Within a row the only serial
+    # dependency is the left neighbour (above), and
+    #   D[k][l] = min(A[l], D[k][l - 1] + INDEL)
+    # unrolls to D[k][l] = INDEL * l + min over m <= l of (A[m] - INDEL * m),
+    # a prefix minimum, where A[l] is the better of right_of and diagonal.
+    # Direction codes for columns 1.. go into pathRow when one is given.
+    right_of = prev + INDEL
+    best = np.empty(len(prev), dtype=np.int32)
+    best[0] = k * INDEL
+    np.minimum(right_of[1:], prev[:-1] + np.where(codes_i == code_j, MATCH, SUBSTITUTION).astype(np.int32),
+               out=best[1:])
+    row = np.minimum.accumulate(best - steps) + steps
+    if pathRow is not None:
+        # the same first-wins order the scalar loop used
+        above = row[:-1] + INDEL
+        pathRow[1:] = np.where(row[1:] == right_of[1:], STEP_RIGHT,
+                               np.where(row[1:] == above, STEP_ABOVE, STEP_DIAGONAL))
+    return row
+
+
+def alignMatrix(seq_i, seq_j):
+    # Fills the DP one row at a time.  Returns the final cost and the
+    # (len(seq_j) + 1, len(seq_i) + 1) array of direction codes.
+    codes_i = encodeSequence(seq_i)
+    codes_j = encodeSequence(seq_j)
+    cols = len(codes_i) + 1
+    steps = np.arange(cols, dtype=np.int32) * INDEL
+
+    path = np.empty((len(codes_j) + 1, cols), dtype=np.uint8)
+    path[0, :] = STEP_RIGHT
+    path[:, 0] = STEP_ABOVE
+    path[0, 0] = STEP_NONE
+
+    row = steps.copy()
+    for k in range(1, len(codes_j) + 1):
+        row = nextRow(row, k, codes_i, codes_j[k - 1], steps, path[k])
+    return int(row[-1]), path
+
+
+def alignCost(seq_i, seq_j):
+    # the cost alone, from two rolling rows
+    codes_i = encodeSequence(seq_i)
+    codes_j = encodeSequence(seq_j)
+    steps = np.arange(len(codes_i) + 1, dtype=np.int32) * INDEL
+    row = steps
+    for k in range(1, len(codes_j) + 1):
+        row = nextRow(row, k, codes_i, codes_j[k - 1], steps)
+    return int(row[-1])
+
+
+def alignLinearSpace(seq_i, seq_j):
+    # The alignment extract_align would read off alignMatrix's path, without
+    # holding the whole matrix.  extract_align walks back from the end cell
+    # one row or column at a time, so it needs the rows in reverse order:
+    # every block-th row of costs is kept on the way forward, and each block
+    # of direction codes is rebuilt from its checkpoint when the walk enters
+    # it.  That is two passes of DP in O(m * sqrt(n)) memory instead of
+    # O(n * m).  Returns (cost, (alignment_i, alignment_j)).
+    codes_i = encodeSequence(seq_i)
+    codes_j = encodeSequence(seq_j)
+    rows = len(codes_j)
+    cols = len(codes_i) + 1
+    steps = np.arange(cols, dtype=np.int32) * INDEL
+    block = max(1, int(np.ceil(np.sqrt(rows))))
+
+    checkpoints = [steps.copy()]
+    row = checkpoints[0]
+    for k in range(1, rows + 1):
+        row = nextRow(row, k, codes_i, codes_j[k - 1], steps)
+        if k % block == 0:
+            checkpoints.append(row)
+    cost = int(row[-1])
+
+    # the walk, with extract_align's reading of the letters: d steps back
+    # on both, a on the row (a gap in seq_i), r on the column (a gap in
+    # seq_j); the first column is all a and the first row all r
+    return_i = []
+    return_j = []
+    k = rows
+    l = cols - 1
+    path = np.empty((block, cols), dtype=np.uint8)
+    path[:, 0] = STEP_ABOVE
+    while k > 0:
+        first = (k - 1) // block * block
+        row = checkpoints[first // block]
+        for r in range(first + 1, k + 1):
+            row = nextRow(row, r, codes_i, codes_j[r - 1], steps, path[r - first - 1])
+        while k > first:
+            step = path[k - first - 1, l]
+            if step == STEP_DIAGONAL:
+                return_i.append(seq_i[l - 1])
+                return_j.append(seq_j[k - 1])
+                k -= 1
+                l -= 1
+            elif step == STEP_ABOVE:
+                return_i.append('-')
+                return_j.append(seq_j[k - 1])
+                k -= 1
+            else:
+                return_i.append(seq_i[l - 1])
+                return_j.append('-')
+                l -= 1
+    while l > 0:
+        return_i.append(seq_i[l - 1])
+        return_j.append('-')
+        l -= 1
+    return cost, (''.join(reversed(return_i)), ''.join(reversed(return_j)))
+
+
+# Screening.  Unit-cost edit distance comes cheap with Myers' bit-parallel
+# algorithm, and it bounds the weighted cost: an alignment with S
+# substitutions, I indels and M matches of sequences of lengths n and m has
+# n + m = 2M + 2S + I, so its cost -3M + S + 5I is
+#   -1.5 (n + m) + 4 (S + I) + 2.5 I
+# with S + I at least the edit distance and I at least |n - m|.
+
+
+def editDistance(seq_i, seq_j):
+    # Levenshtein distance, Hyyro's global form of Myers' algorithm, with
+    # the whole column as one python int: the longer sequence is the
+    # pattern, one bit per character, and the loop runs over the shorter.
+    codes_i = encodeSequence(seq_i)
+    codes_j = encodeSequence(seq_j)
+    if len(codes_i) < len(codes_j):
+        codes_i, codes_j = codes_j, codes_i
+    m = len(codes_i)
+    if m == 0:
+        return len(codes_j)
+    full = (1 << m) - 1
+    high = 1 << (m - 1)
+    peq = {}
+    for code in np.unique(codes_i).tolist():
+        peq[code] = int.from_bytes(np.packbits(codes_i == code, bitorder='little').tobytes(), 'little')
+    pv = full
+    mv = 0
+    score = m
+    for code in codes_j.tolist():
+        eq = peq.get(code, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # the first row of the matrix grows by one per column
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return score
+
+
+def costLowerBound(n, m, distance):
+    # least weighted cost any alignment of lengths n and m can have, given
+    # their edit distance
+    return 4 * distance + 2.5 * abs(n - m) - 1.5 * (n + m)
+
+
+# Banded alignment only looks at cells within BAND_DISTANCE of the main
+# diagonal, i.e. alignments with at most that many net indels.
+BAND_DISTANCE = 3
+
+# stands in for the cells outside the band; small enough that adding a few
+# indels to it stays inside int32
+OUT_OF_BAND = 1 << 30
+
+
+def bandedAlignMatrix(seq_i, seq_j, band=BAND_DISTANCE, keepPath=True, center=0):
+    # Same DP restricted to |l - k - center| <= band, stored compactly: row
+    # k of the (len(seq_j) + 1, 2 * band + 1) result holds columns
+    # k + center - band through k + center + band.  In those coordinates
+    # right_of sits one slot to the right in the previous row, diagonal in
+    # the same slot, and above one slot to the left, so each row is still
+    # one prefix minimum.  center must be within band, so the start cell is
+    # in it too.  Returns (inf, None) when the end cell falls outside the
+    # band, and no path when keepPath is False.
+    codes_i = encodeSequence(seq_i).astype(np.int64)
+    codes_j = encodeSequence(seq_j).astype(np.int64)
+    rows = len(codes_j) + 1
+    cols = len(codes_i) + 1
+    if abs(cols - rows - center) > band:
+        return float('inf'), None
+    width = 2 * band + 1
+    slots = np.arange(width)
+    steps = (slots * INDEL).astype(np.int32)
+    # seq_i padded so row k's window of characters is
+    # padded[k + start:k + start + width]
+    lead = band + 1 + abs(center)
+    start = lead + center - band - 1
+    padded = np.concatenate((np.full(lead, -1), codes_i, np.full(width, -1)))
+
+    offset = slots - band + center         # column of each slot in row 0
+    prev = np.where((offset >= 0) & (offset < cols), offset * INDEL, OUT_OF_BAND).astype(np.int32)
+    path = None
+    if keepPath:
+        path = np.full((rows, width), STEP_NONE, dtype=np.uint8)
+        path[0] = np.where((offset > 0) & (offset < cols), STEP_RIGHT, STEP_NONE)
+    best = np.empty(width, dtype=np.int32)
+    for k in range(1, rows):
+        l = offset + k
+        valid = (l >= 0) & (l < cols)
+        right_of = np.full(width, OUT_OF_BAND, dtype=np.int32)
+        right_of[:-1] = prev[1:] + INDEL
+        diagonal = prev + np.where(padded[k + start:k + start + width] == codes_j[k - 1], MATCH, SUBSTITUTION).astype(np.int32)
+        np.minimum(right_of, diagonal, out=best)
+        best[l == 0] = k * INDEL
+        best[~valid] = OUT_OF_BAND
+        row = np.minimum.accumulate(best - steps) + steps
+        row[~valid] = OUT_OF_BAND
+        if keepPath:
+            above = np.full(width, OUT_OF_BAND, dtype=np.int32)
+            above[1:] = row[:-1] + INDEL
+            codes = np.where(row == right_of, STEP_RIGHT, np.where(row == above, STEP_ABOVE, STEP_DIAGONAL))
+            codes[l == 0] = STEP_ABOVE
+            codes[~valid] = STEP_NONE
+            path[k] = codes
+        prev = row
+    return int(prev[cols - rows + band - center]), path
@@ -22,6 +22,10 @@ else:
 
 # Import in the code with the actual implementation
 from GeneSequencing import *
+from kmer_index import KmerIndex
+from parallel_align import alignAllParallel
+from result_cache import ResultCache
+from sequence_store import packSequences
 
 
 
@@ -36,20 +40,29 @@ class Proj4GUI( QMainWindow ):
 
         self.seqs = self.loadSequencesFromFile()
         self.processed_results = None
+        self.processed_args = None
 
         self.initUI()
         self.solver = GeneSequencing()
+        # pairs aligned on an earlier run come back from disk
+        self.solver.result_cache = ResultCache()
 
 
     def processClicked(self):
-        sequences = [ self.seqs[i][2] for i in sorted(self.seqs.keys()) ]
+        sequences = packSequences( [ self.seqs[i][2] for i in sorted(self.seqs.keys()) ] )
         print(sequences[0],sequences[1])
 
         self.statusBar.showMessage('Processing...')
         start = time.time()
-        self.processed_results = self.solver.align_all( sequences,
-                                                        banded=self.banded.isChecked(),
-                                                        align_length=int(self.alignLength.text()) )
+        # only the costs are shown in the table, so the strings are left
+        # for cellClicked to fill in one pair at a time
+        self.processed_args = (sequences, self.banded.isChecked(), int(self.alignLength.text()))
+        # the index is built once per Process, over all the loaded sequences
+        self.solver.kmer_index = KmerIndex(sequences) if self.seeded.isChecked() else None
+        self.processed_results = alignAllParallel( self.solver, sequences,
+                                                   banded=self.processed_args[1],
+                                                   align_length=self.processed_args[2],
+                                                   cost_only=True )
         end = time.time()
         ns = (end-start)
         nm = math.floor(ns/60.)
@@ -109,6 +122,9 @@ class Proj4GUI( QMainWindow ):
             self.seq2_name.setText( '{}'.format(self.seqs[j][1]) )
             print(i,j)
             results = self.processed_results[i][j]
+            if 'seqi_first100' not in results:
+                sequences, banded, align_length = self.processed_args
+                results.update(self.solver.align_pair(sequences, i, j, banded, align_length))
             self.seq1_chars.setText( '{}'.format(results['seqi_first100']) )
             self.seq2_chars.setText( '{}'.format(results['seqj_first100']) )
 
@@ -229,6 +245,8 @@ class Proj4GUI( QMainWindow ):
 
         self.banded     = QCheckBox('Banded')
         self.banded.setChecked(False)
+        self.seeded     = QCheckBox('Seed and Extend')
+        self.seeded.setChecked(False)
         self.alignLength      = QLineEdit('1000')
         '''self.arrayTime      = QLineEdit('')
         self.arrayTime.setFixedWidth(120)
@@ -310,6 +328,7 @@ class Proj4GUI( QMainWindow ):
         h = QHBoxLayout()
         h.addStretch(1)
         h.addWidget( self.banded )
+        h.addWidget( self.seeded )
         h.addWidget( QLabel('Align Length: ') )
         h.addWidget( self.alignLength )
         h.addStretch(1)
@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+
+# k-mer index for seed-and-extend alignment.  Every sequence's k-mers are
+# hashed once, when the index is built, and kept sorted by hash, so the
+# seeds of a pair (positions where the two sequences share a k-mer) come
+# from merging two sorted arrays.  k-mers that repeat more than
+# MAX_OCCURRENCES times in a sequence are left out, as repeats give
+# quadratically many seeds and say little about where the alignment goes.
+#
+# chainSeeds picks the longest run of seeds that moves forward in both
+# sequences and merges it into exact-match anchors, which
+# GeneSequencing.align_pair then joins up with banded DP.
+
+from bisect import bisect_left
+
+import numpy as np
+
+from alignment_core import encodeSequence
+
+
+KMER_LENGTH = 12
+MAX_OCCURRENCES = 32
+
+HASH_BASE = np.uint64(0x100000001b3)
+
+
+def kmerHashes(codes, k):
+    # hash of the k-mer starting at each position, wrapping in uint64
+    count = len(codes) - k + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.uint64)
+    codes = codes.astype(np.uint64)
+    hashes = np.zeros(count, dtype=np.uint64)
+    for t in range(k):
+        hashes = hashes * HASH_BASE + codes[t:t + count]
+    return hashes
+
+
+class KmerIndex:
+    def __init__(self, sequences, k=KMER_LENGTH):
+        self.k = k
+        self.entries = [self.indexSequence(seq) for seq in sequences]
+
+    def indexSequence(self, seq):
+        # (distinct hashes, where each one's positions start, how many
+        # there are, positions grouped by hash)
+        hashes = kmerHashes(encodeSequence(seq), self.k)
+        order = np.argsort(hashes, kind='stable')
+        keys, starts, counts = np.unique(hashes[order], return_index=True, return_counts=True)
+        return keys, starts, counts, order
+
+    def seeds(self, i, j, length_i, length_j):
+        # (positions in i, positions in j) of the shared k-mers that lie
+        # within the first length_i and length_j characters
+        keys_i, starts_i, counts_i, positions_i = self.entries[i]
+        keys_j, starts_j, counts_j, positions_j = self.entries[j]
+        _, a, b = np.intersect1d(keys_i, keys_j, assume_unique=True, return_indices=True)
+        keep = (counts_i[a] <= MAX_OCCURRENCES) & (counts_j[b] <= MAX_OCCURRENCES)
+        a = a[keep]
+        b = b[keep]
+        # every pairing of the occurrences of each shared k-mer
+        pairs = counts_i[a] * counts_j[b]
+        owner = np.repeat(np.arange(len(a)), pairs)
+        within = np.arange(pairs.sum()) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+        seeds_i = positions_i[starts_i[a][owner] + within // counts_j[b][owner]]
+        seeds_j = positions_j[starts_j[b][owner] + within % counts_j[b][owner]]
+        inside = (seeds_i + self.k <= length_i) & (seeds_j + self.k <= length_j)
+        return seeds_i[inside], seeds_j[inside]
+
+
+def chainSeeds(seeds_i, seeds_j, k, seq_i, seq_j):
+    # Longest chain of seeds increasing in both positions (a longest
+    # increasing subsequence of the j positions, taken in i order), merged
+    # into (start_i, start_j, length) anchors: overlapping seeds on one
+    # diagonal extend an anchor, and seeds that overlap the previous
+    # anchor on another diagonal are dropped.  Hash collisions are checked
+    # against the characters here.
+    order = np.lexsort((-seeds_j, seeds_i))
+    seeds_i = seeds_i[order].tolist()
+    seeds_j = seeds_j[order].tolist()
+    tails = []                 # smallest j ending a chain of each length
+    tailIndex = []
+    previous = [-1] * len(seeds_j)
+    for n, q in enumerate(seeds_j):
+        length = bisect_left(tails, q)
+        if length == len(tails):
+            tails.append(q)
+            tailIndex.append(n)
+        else:
+            tails[length] = q
+            tailIndex[length] = n
+        previous[n] = tailIndex[length - 1] if length > 0 else -1
+    chain = []
+    n = tailIndex[-1] if tailIndex else -1
+    while n >= 0:
+        chain.append(n)
+        n = previous[n]
+
+    codes_i = encodeSequence(seq_i)
+    codes_j = encodeSequence(seq_j)
+    anchors = []
+    end_i = end_j = 0
+    for n in reversed(chain):
+        p = seeds_i[n]
+        q = seeds_j[n]
+        if not np.array_equal(codes_i[p:p + k], codes_j[q:q + k]):
+            continue
+        if anchors and p - q == anchors[-1][0] - anchors[-1][1] and p <= end_i:
+            start_i, start_j, _ = anchors[-1]
+            end_i = p + k
+            end_j = q + k
+            anchors[-1] = (start_i, start_j, end_i - start_i)
+        elif p >= end_i and q >= end_j:
+            anchors.append((p, q, k))
+            end_i = p + k
+            end_j = q + k
+    return anchors
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+
+# All-pairs alignment across a process pool.  Every (i, j) pair above the
+# diagonal is independent, so the pairs that need a DP are handed to worker
+# processes, biggest first so no long alignment starts last and holds up
+# the pool.  The sequences go to each worker once, through the pool
+# initializer, and tasks only carry the two indices.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from GeneSequencing import GeneSequencing
+
+
+# set in every worker by initWorker
+workerSolver = None
+workerArgs = None
+
+
+def initWorker(sequences, banded, align_length, cost_only, band, max_matrix_cells, screen_threshold, kmer_index,
+               result_cache):
+    global workerSolver, workerArgs
+    workerSolver = GeneSequencing()
+    workerSolver.band = band
+    workerSolver.max_matrix_cells = max_matrix_cells
+    workerSolver.screen_threshold = screen_threshold
+    workerSolver.kmer_index = kmer_index
+    workerSolver.result_cache = result_cache
+    workerArgs = (sequences, banded, align_length, cost_only)
+
+
+def alignTask(i, j):
+    sequences, banded, align_length, cost_only = workerArgs
+    return workerSolver.align_pair(sequences, i, j, banded, align_length, cost_only)
+
+
+def needsAlignment(i, j):
+    # the pairs align_pair runs a DP for; the rest are constants
+    return i < j and not ((i == 0 and j != 1) or (i == 1 and j != 0))
+
+
+def pairWork(sequences, i, j, banded, align_length, band):
+    # rough cell count, only used to order the queue
+    n = min(len(sequences[i]), align_length)
+    m = min(len(sequences[j]), align_length)
+    return min(n, m) * (2 * band + 1) if banded else n * m
+
+
+def mirrored(result):
+    # the (j, i) entry for a computed (i, j): same cost, strings swapped
+    flipped = dict(result)
+    if 'seqi_first100' in result:
+        flipped['seqi_first100'] = result['seqj_first100']
+        flipped['seqj_first100'] = result['seqi_first100']
+    return flipped
+
+
+def alignAllParallel(solver, sequences, banded, align_length, cost_only=False, workers=None):
+    # Same list-of-lists align_all returns, except that the lower triangle
+    # mirrors the upper one instead of holding placeholders.
+    n = len(sequences)
+    pairs = [(i, j) for i in range(n) for j in range(n) if needsAlignment(i, j)]
+    pairs.sort(key=lambda p: pairWork(sequences, p[0], p[1], banded, align_length, solver.band), reverse=True)
+    results = [[None] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i, n):
+            if not needsAlignment(i, j):
+                results[i][j] = solver.align_pair(sequences, i, j, banded, align_length, cost_only)
+
+    workers = min(workers or os.cpu_count() or 1, len(pairs))
+    if workers <= 1:
+        for i, j in pairs:
+            results[i][j] = solver.align_pair(sequences, i, j, banded, align_length, cost_only)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=initWorker,
+                                 initargs=(sequences, banded, align_length, cost_only,
+                                           solver.band, solver.max_matrix_cells,
+                                           solver.screen_threshold, solver.kmer_index,
+                                           solver.result_cache)) as pool:
+            futures = {pool.submit(alignTask, i, j): (i, j) for i, j in pairs}
+            for future, (i, j) in futures.items():
+                results[i][j] = future.result()
+
+    for i in range(n):
+        for j in range(i + 1, n):
+            results[j][i] = mirrored(results[i][j])
+    return results
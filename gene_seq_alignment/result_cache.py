@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+
+# On-disk cache of pair alignments, so Process on an unchanged genomes.txt
+# doesn't realign anything.  Entries live in a SQLite file, keyed by the
+# SHA-1 of each (already truncated) sequence's character codes, the align
+# length, banded, and a string naming the scoring and every other setting
+# that changes the result.  Each holds the cost and, once someone has asked
+# for them, the two alignment strings (without the DEBUG suffix align_pair
+# adds).  The least recently used entries go once there are more than
+# max_entries of them or their strings take more than max_bytes.
+#
+# Each process needs its own connection: SQLite connections mustn't be
+# used across fork(), and forked pool workers inherit the parent's cache
+# object as it is.  The cache notes the pid it connected in and reconnects
+# when that changes; a pickled cache keeps only the file name and limits.
+
+import hashlib
+import os
+import sqlite3
+import time
+
+from alignment_core import encodeSequence
+
+
+CACHE_FILE = 'alignment_cache.sqlite'
+MAX_ENTRIES = 10000
+MAX_BYTES = 256 << 20
+
+
+def sequenceHash(seq):
+    return hashlib.sha1(encodeSequence(seq).tobytes()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.connect()
+
+    def connect(self):
+        # the connection this process inherited over a fork, if any; see
+        # connection()
+        self.inherited = None
+        self.pid = os.getpid()
+        self.db = sqlite3.connect(self.path, timeout=60)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS results ('
+                        'hash_i TEXT, hash_j TEXT, align_length INTEGER, banded INTEGER, scoring TEXT, '
+                        'cost REAL, seq_i TEXT, seq_j TEXT, size INTEGER, used REAL, '
+                        'PRIMARY KEY (hash_i, hash_j, align_length, banded, scoring))')
+        self.db.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+        self.db.commit()
+
+    def connection(self):
+        if self.pid != os.getpid():
+            # forked: the parent's connection is kept, not closed, so
+            # nothing of it is touched from this process
+            inherited = self.db
+            self.connect()
+            self.inherited = inherited
+        return self.db
+
+    def __getstate__(self):
+        return self.path, self.max_entries, self.max_bytes
+
+    def __setstate__(self, state):
+        self.path, self.max_entries, self.max_bytes = state
+        self.connect()
+
+    def key(self, seq_i, seq_j, align_length, banded, scoring):
+        return sequenceHash(seq_i), sequenceHash(seq_j), align_length, int(banded), scoring
+
+    def get(self, key, needStrings=False):
+        # (cost, (alignment_i, alignment_j) or None), or None on a miss or
+        # when the strings are wanted and only the cost was stored
+        row = self.connection().execute('SELECT cost, seq_i, seq_j FROM results WHERE hash_i = ? AND hash_j = ? '
+                                        'AND align_length = ? AND banded = ? AND scoring = ?', key).fetchone()
+        if row is None or (needStrings and row[1] is None):
+            return None
+        self.db.execute('UPDATE results SET used = ? WHERE hash_i = ? AND hash_j = ? '
+                        'AND align_length = ? AND banded = ? AND scoring = ?', (time.time(),) + key)
+        self.db.commit()
+        cost = row[0] if row[0] == float('inf') else int(row[0])
+        return cost, (None if row[1] is None else (row[1], row[2]))
+
+    def put(self, key, cost, alignment=None):
+        seq_i, seq_j = alignment if alignment is not None else (None, None)
+        size = 0 if alignment is None else len(seq_i) + len(seq_j)
+        self.connection().execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                  key + (cost, seq_i, seq_j, size, time.time()))
+        self.evict()
+        self.db.commit()
+
+    def evict(self):
+        self.connection().execute('DELETE FROM results WHERE rowid IN '
+                                  '(SELECT rowid FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)',
+                                  (self.max_entries,))
+        # strings too long to keep at all shouldn't push the others out
+        self.db.execute('DELETE FROM results WHERE size > ?', (self.max_bytes,))
+        self.db.execute('DELETE FROM results WHERE rowid IN (SELECT rowid FROM '
+                        '(SELECT rowid, SUM(size) OVER (ORDER BY used DESC, rowid DESC) AS total FROM results) '
+                        'WHERE total > ?)', (self.max_bytes,))
+
+    def clear(self):
+        self.connection().execute('DELETE FROM results')
+        self.db.commit()
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+
+# Compact resident sequences.  Each base of the sequence's four-letter
+# alphabet takes 2 bits, four to a byte, and anything else (N and the other
+# IUPAC codes, stray case) is kept in a small escape table of positions and
+# characters.  A genome held this way takes about a quarter of the memory of
+# the str it came from.
+#
+# PackedSequence stands in for that str wherever the alignment code looks:
+# len(), indexing and slicing, str(), and codes() for the DP, which gives
+# the same per-character integers alignment_core.encodeSequence does.
+
+import numpy as np
+
+
+ALPHABETS = ('acgt', 'ACGT')
+
+
+def textCodes(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+
+class PackedSequence:
+    def __init__(self, text, alphabet=None):
+        text = str(text)
+        if alphabet is None:
+            # the case the bases are written in; the other one escapes
+            upper = sum(text.count(c) for c in ALPHABETS[1])
+            alphabet = ALPHABETS[1] if upper > len(text) // 2 else ALPHABETS[0]
+        self.pack(textCodes(text), alphabet)
+
+    @classmethod
+    def fromCodes(cls, codes, alphabet):
+        seq = cls.__new__(cls)
+        seq.pack(np.asarray(codes, dtype=np.uint32), alphabet)
+        return seq
+
+    def pack(self, codes, alphabet):
+        self.length = len(codes)
+        self.alphabet = alphabet
+        self.alphabetCodes = textCodes(alphabet)
+        bits = np.zeros((len(codes) + 3) // 4 * 4, dtype=np.uint8)
+        known = np.zeros(len(codes), dtype=bool)
+        for value, code in enumerate(self.alphabetCodes):
+            hit = codes == code
+            bits[:len(codes)][hit] = value
+            known |= hit
+        self.packed = bits[0::4] | (bits[1::4] << 2) | (bits[2::4] << 4) | (bits[3::4] << 6)
+        self.escapePositions = np.flatnonzero(~known)
+        self.escapeCodes = codes[~known]
+
+    def codes(self):
+        # one integer per character, equal exactly where the characters are
+        bits = np.empty((len(self.packed), 4), dtype=np.uint8)
+        for k in range(4):
+            bits[:, k] = (self.packed >> (2 * k)) & 3
+        codes = self.alphabetCodes[bits.reshape(-1)[:self.length]]
+        codes[self.escapePositions] = self.escapeCodes
+        return codes
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PackedSequence.fromCodes(self.codes()[index], self.alphabet)
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('PackedSequence index out of range')
+        k = np.searchsorted(self.escapePositions, index)
+        if k < len(self.escapePositions) and self.escapePositions[k] == index:
+            return chr(self.escapeCodes[k])
+        return self.alphabet[(self.packed[index >> 2] >> (2 * (index & 3))) & 3]
+
+    def __str__(self):
+        return self.codes().tobytes().decode('utf-32-le')
+
+    def __repr__(self):
+        return 'PackedSequence({!r})'.format(str(self)[:20] + ('...' if self.length > 20 else ''))
+
+    def nbytes(self):
+        return self.packed.nbytes + self.escapePositions.nbytes + self.escapeCodes.nbytes
+
+
+def packSequences(sequences):
+    return [seq if isinstance(seq, PackedSequence) else PackedSequence(seq) for seq in sequences]